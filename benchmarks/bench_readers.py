@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_path)
+
+from sweep_reader import ENGINES, hdf5_twin, read_sweep, read_sweep_hdf5
+
+# The original two-pass loader: readlines() for the header, then read_csv with type inference
+def legacy_load_data(path):
+    with open(path, "r") as file:
+        lines = file.readlines()
+
+    header_line = next((line.lstrip("# ").strip() for line in lines if line.startswith("#")), None)
+    return pd.read_csv(path, sep=r"\s+", comment="#", names=header_line.split("\t"))
+
+# Function to time one loader over every file, keeping the best of several rounds
+def time_loader(loader, paths, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for path in paths:
+            loader(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sweep readers over raw_data/*.txt")
+    parser.add_argument("--data-dir", default=os.path.join(base_path, "raw_data"))
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = sorted(os.path.join(args.data_dir, f) for f in os.listdir(args.data_dir) if f.endswith(".txt"))
+    print(f"{len(paths)} .txt files in {args.data_dir}, best of {args.rounds} rounds")
+
+    # Every engine must return the same values as the legacy loader
+    for path in paths:
+        expected = legacy_load_data(path)
+        for engine in ENGINES:
+            pd.testing.assert_frame_equal(read_sweep(path, engine), expected, check_dtype=False)
+
+    loaders = {"legacy": legacy_load_data}
+    loaders.update({engine: lambda path, engine=engine: read_sweep(path, engine) for engine in ENGINES})
+    report(loaders, paths, args.rounds)
+
+    # Binary reads only cover the files that have an .hdf5 twin, so compare on that subset
+    twinned = [path for path in paths if hdf5_twin(path)]
+    print(f"\n{len(twinned)} of them have an .hdf5 twin")
+    loaders["hdf5"] = lambda path: read_sweep_hdf5(hdf5_twin(path))
+    report(loaders, twinned, args.rounds)
+
+# Function to print the timing of every loader relative to the first one
+def report(loaders, paths, rounds):
+    baseline = None
+    for name, loader in loaders.items():
+        elapsed = time_loader(loader, paths, rounds)
+        baseline = baseline or elapsed
+        print(f"{name:>8}: {elapsed * 1000:8.1f} ms total, {elapsed / len(paths) * 1e6:7.1f} us/file, {baseline / elapsed:5.2f}x")
+
+if __name__ == "__main__":
+    main()
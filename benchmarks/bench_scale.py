@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_path)
+
+from synthetic_sweeps import BASE_MEASUREMENTS, BANDS, generate
+
+# Stages timed at every scale, in pipeline order; each runs in a fresh process so its peak RSS is its own
+STAGES = ["parse", "load_cold", "load_warm", "group", "combine", "figure"]
+
+# Dashboard grouping, mirrored from freq-filter-dataviz.py
+dashboard_group_fields = ["device_configuration", "frequency_range", "datapoint_capture", "voltage_offset"]
+overlay_levels = ["device_chemistry", "voltage_amplitude", "Oscilator_frequency (Hz)"]
+
+def scan(data_dir):
+    from sweep_engine import SweepEngine
+
+    return SweepEngine(data_dir).scan()
+
+def load(data_dir, cache_dir, catalog):
+    from sweep_cube import load_cube
+    from sweep_engine import SweepEngine
+
+    engine = SweepEngine(data_dir, cache_dir)
+    return load_cube(data_dir, catalog, engine.cache)
+
+# Function to aggregate a cube per dashboard group the way group_data does (default Y channel)
+def aggregate(cube):
+    import numpy as np
+
+    from sweep_catalog import group_files
+    from sweep_grid import align_cube
+    from sweep_stats import GroupStats
+
+    cube = align_cube(cube)
+    columns = ["Oscilator_frequency (Hz)", "Demod_4_X_A (V)"]
+    positions = [cube.channel_index[column] for column in columns]
+    chemistries, amplitudes = cube.metadata["device_chemistry"], cube.metadata["amplitude_v"]
+    stats = {}
+    for key, files in group_files(cube.metadata, dashboard_group_fields).items():
+        group = stats[key] = GroupStats(overlay_levels)
+        for row in cube.rows(files):
+            points = cube.points(row)
+            levels = [np.full(len(points), chemistries.iloc[row], dtype=object), np.full(len(points), amplitudes.iloc[row]), points[:, positions[0]]]
+            group.add_values(levels, columns, points[:, positions])
+    return stats
+
+# Function to run one stage in this process; returns the seconds spent in the stage itself
+# (loading the sweeps a later stage needs is not counted)
+def run_stage(stage, data_dir, cache_dir):
+    start = time.perf_counter()
+    catalog = scan(data_dir)
+    if stage == "parse":
+        return time.perf_counter() - start
+
+    if stage in ("load_cold", "load_warm"):
+        start = time.perf_counter()
+        load(data_dir, cache_dir, catalog)
+        return time.perf_counter() - start
+
+    cube = load(data_dir, cache_dir, catalog)
+    if stage == "group":
+        start = time.perf_counter()
+        aggregate(cube)
+        return time.perf_counter() - start
+
+    if stage == "combine":
+        from combine_freq import combine_sweeps, group_fields, required_ranges
+        from sweep_catalog import group_files
+
+        start = time.perf_counter()
+        for files in group_files(catalog, group_fields).values():
+            if set(catalog.loc[files, "frequency_range"]) == required_ranges:
+                combine_sweeps(cube, cube.rows(files))
+        return time.perf_counter() - start
+
+    if stage == "figure":
+        import plotly.graph_objects as go
+
+        from sweep_figures import sweep_trace
+
+        stats = aggregate(cube)
+        start = time.perf_counter()
+        # The largest group, every chemistry at its first amplitude, as the chemistry tab draws it
+        group = max(stats.values(), key=lambda group: len(group.rows))
+        traces = group.traces()
+        amplitude = next(iter(traces))[1]
+        x_position, y_position = group.columns.index("Oscilator_frequency (Hz)"), group.columns.index("Demod_4_X_A (V)")
+        fig = go.Figure()
+        for (chemistry, trace_amplitude), (mean, std) in traces.items():
+            if trace_amplitude == amplitude:
+                fig.add_trace(sweep_trace(mean[x_position], mean[y_position], std[y_position], name=chemistry))
+        fig.to_json()
+        return time.perf_counter() - start
+
+    raise ValueError(f"unknown stage {stage!r}, expected one of {STAGES}")
+
+# Function to run a stage in a child process; returns (seconds, peak RSS in MB)
+def measure(stage, data_dir, cache_dir):
+    output = subprocess.run(
+        [sys.executable, __file__, "--stage", stage, "--data-dir", data_dir, "--cache-dir", cache_dir],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    return result["seconds"], result["peak_rss_mb"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every pipeline stage on synthetic archives of growing size")
+    parser.add_argument("--scales", default="1,10", help="comma-separated sizes relative to raw_data, e.g. 1,10,100,1000")
+    parser.add_argument("--work-dir", help="where the synthetic archives go (default: a temporary directory)")
+    parser.add_argument("--hdf5", action="store_true", help="give every synthetic sweep an .hdf5 twin (read instead of the .txt with SWEEP_PREFER_HDF5=1)")
+    parser.add_argument("--keep", action="store_true", help="keep the synthetic archives afterwards")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--stage", choices=STAGES, help=argparse.SUPPRESS)
+    parser.add_argument("--data-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Child process: run one stage and report it as one JSON line
+    if args.stage:
+        seconds = run_stage(args.stage, args.data_dir, args.cache_dir)
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(json.dumps({"seconds": seconds, "peak_rss_mb": peak_rss_mb}))
+        return
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="sweep-bench-")
+    results = []
+    print(f"{'scale':>6} {'files':>8} {'stage':>10} {'seconds':>9} {'peak MB':>8}")
+    for scale in (float(value) for value in args.scales.split(",")):
+        data_dir = os.path.join(work_dir, f"data-{scale:g}x")
+        cache_dir = os.path.join(work_dir, f"cache-{scale:g}x")
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        start = time.perf_counter()
+        if not os.path.isdir(data_dir):
+            generate(data_dir, scale, hdf5=args.hdf5)
+        files = int(round(BASE_MEASUREMENTS * scale)) * len(BANDS)
+        print(f"{scale:>5g}x {files:>8} {'generate':>10} {time.perf_counter() - start:>9.2f} {'':>8}")
+
+        for stage in STAGES:
+            seconds, peak_rss_mb = measure(stage, data_dir, cache_dir)
+            results.append({"scale": scale, "files": files, "stage": stage, "seconds": seconds, "peak_rss_mb": peak_rss_mb})
+            print(f"{scale:>5g}x {files:>8} {stage:>10} {seconds:>9.2f} {peak_rss_mb:>8.0f}")
+
+        if not args.keep:
+            shutil.rmtree(data_dir, ignore_errors=True)
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=1)
+    if not args.keep and not args.work_dir:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry points whose start-up imports are profiled
+ENTRY_POINTS = {"dashboard": "freq-filter-dataviz.py", "combine": "combine_freq.py"}
+
+# Function to collect the module-level import statements of a script, the ones every start pays for
+# (imports inside functions only run when they are needed, so they are left out)
+def startup_imports(path):
+    with open(path) as file:
+        tree = ast.parse(file.read(), path)
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+# Function to run the imports once in a fresh interpreter under -X importtime; returns
+# {module: (self us, cumulative us)} as reported on stderr, each module indented by its import depth
+def import_times(code):
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=base_path, check=True, capture_output=True, text=True,
+    ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        times[name[1:].rstrip()] = (int(self_us), int(cumulative_us))
+    return times
+
+# Function to profile one entry point: total import time (sum of the top-level imports' cumulative
+# times) and the heaviest modules, each the median over repeats runs
+def profile(path, repeats, top):
+    code = startup_imports(path)
+    runs = [import_times(code) for _ in range(repeats)]
+    # Top-level imports are the ones -X importtime prints without indentation
+    totals = [sum(cumulative for name, (_, cumulative) in run.items() if not name.startswith(" ")) for run in runs]
+    modules = set().union(*runs)
+    cumulative = {module: statistics.median(run.get(module, (0, 0))[1] for run in runs) for module in modules}
+    heaviest = sorted(cumulative.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "imports": code.splitlines(),
+        "total_ms": statistics.median(totals) / 1000,
+        "modules": len(modules),
+        "heaviest": [{"module": module.strip(), "cumulative_ms": us / 1000} for module, us in heaviest],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the start-up imports of the entry points with -X importtime")
+    parser.add_argument("entry_points", nargs="*", help=f"any of {', '.join(ENTRY_POINTS)} (default: all of them)")
+    parser.add_argument("--repeats", type=int, default=5, help="fresh interpreters per entry point; medians are reported")
+    parser.add_argument("--top", type=int, default=15, help="heaviest modules listed per entry point")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    unknown = [entry_point for entry_point in args.entry_points if entry_point not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"unknown entry points {unknown}, expected any of {list(ENTRY_POINTS)}")
+
+    results = {}
+    for entry_point in args.entry_points or list(ENTRY_POINTS):
+        result = results[entry_point] = profile(os.path.join(base_path, ENTRY_POINTS[entry_point]), args.repeats, args.top)
+        print(f"{entry_point} ({ENTRY_POINTS[entry_point]}): {result['total_ms']:.0f} ms, {result['modules']} modules")
+        for module in result["heaviest"]:
+            print(f"  {module['cumulative_ms']:>8.1f} ms  {module['module']}")
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import argparse
+import datetime
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, base_path)
+
+from sweep_writer import write_sweep
+
+# Data_name rows of the lock-in export: (name, unit, device, description) per column, in file order
+LABELS = [
+    ("Oscilator_frequency", "Hz", "MFLI_dev0000", "Oscillator Frequency"),
+    ("DemodAll_A", "-", "MFLI_dev0000", "Demod All"),
+    ("Demod_1_X_A", "A", "MFLI_dev0000", "I Demod_1_X"),
+    ("Demod_1_Y_A", "A", "MFLI_dev0000", "I Demod_1_Y"),
+    ("Demod_1__R_A", "A", "MFLI_dev0000", "I Demod_1_R"),
+    ("Demod_1__Theta_A", "deg", "MFLI_dev0000", "I Demod_1_Theta"),
+    ("Demod_2_X_A", "A", "MFLI_dev0000", "I Demod_2_X"),
+    ("Demod_2_Y_A", "A", "MFLI_dev0000", "I Demod_2_Y"),
+    ("Demod_2__R_A", "A", "MFLI_dev0000", "I Demod_2_R"),
+    ("Demod_2__Theta_A", "deg", "MFLI_dev0000", "I Demod_2_Theta"),
+    ("Demod_3_X_A", "V", "MFLI_dev0000", "V Demod_3_X"),
+    ("Demod_3_Y_A", "V", "MFLI_dev0000", "V Demod_3_Y"),
+    ("Demod_3__R_A", "V", "MFLI_dev0000", "V Demod_3_R"),
+    ("Demod_3__Theta_A", "deg", "MFLI_dev0000", "V Demod_3_Theta"),
+    ("Demod_4_X_A", "V", "MFLI_dev0000", "V Demod_4_X"),
+    ("Demod_4_Y_A", "V", "MFLI_dev0000", "V Demod_4_Y"),
+    ("Demod_4__R_A", "V", "MFLI_dev0000", "V Demod_4_R"),
+    ("Demod_4__Theta_A", "deg", "MFLI_dev0000", "V Demod_4_Theta"),
+    ("Timer_GET", "s", "Timer2", "Timer"),
+]
+COLUMNS = [f"{name} ({unit})" for name, unit, _, _ in LABELS]
+
+# Metadata values seen in raw_data, drawn from for every synthetic measurement
+CHEMISTRIES = ["unkLi2", "unkK2", "unkNa2"]
+PIXELS = ["R6", "R5", "L5", "L3", "L6", "R4"]
+CONFIGURATIONS = [
+    "LP-4nF-noR", "LP-2.5pF-noR", "LP-2nF-noR", "LP-1.3nF-noR", "LP-0.286nF-noR",
+    "LP-0.5nF-noR", "LP-0.667nF-noR", "LP-1.66nF-noR", "LP-1nF-noR",
+]
+OFFSETS = ["0", "-2", "2", "-1.4", "-2.4", "1.4", "2.4", "-0.5", "0.5", "-1", "1", "-1.5", "1.5", "-2.5", "2.5"]
+AMPLITUDES = ["0.25", "0.4", "0.5", "0.8", "1", "1.4", "1.5", "2", "2.4"]
+
+# The three bands a complete measurement is taken in: (frequency range, start Hz, stop Hz, points)
+BANDS = [("500k-5kHz", 500e3, 5e3, 100), ("5k-200Hz", 5e3, 200.0, 97), ("200-1Hz", 200.0, 1.0, 200)]
+
+# Measurements (one file per band each) in the current raw_data: 549 files, so scale 1 matches it
+BASE_MEASUREMENTS = 183
+
+# Measurements taken per day; the date and degradation days advance with them
+MEASUREMENTS_PER_DAY = 60
+
+FIRST_DATE = datetime.date(2025, 3, 4)
+
+# Function to derive the cut-off frequency of a low-pass configuration from its capacitance (100 kOhm load)
+def cutoff_frequency(configuration):
+    match = re.match(r"LP-([\d.]+)([np])F", configuration)
+    if not match:
+        return 1e3
+    capacitance = float(match.group(1)) * {"n": 1e-9, "p": 1e-12}[match.group(2)]
+    return 1 / (2 * np.pi * 1e5 * capacitance)
+
+# Function to simulate one band of a sweep: a first-order low-pass response seen by the lock-in,
+# swept linearly from start to stop like the instrument does, with a little measurement noise
+def simulate_band(rng, start, stop, points, cutoff, amplitude, timer_start):
+    frequency = np.round(np.linspace(start, stop, points), 6)
+    response = 1 / (1 + 1j * frequency / cutoff)
+    vout = amplitude / np.sqrt(2) * response * (1 + rng.normal(0, 1e-3, points))
+
+    values = np.zeros((points, len(COLUMNS)))
+    values[:, 0] = frequency
+    values[:, 1] = 1.0
+    values[:, 5] = -90.0
+    # Demod_2 and Demod_4 read the same output in the archive; Demod_3 picks up a small quadrature signal
+    for first in (6, 14):
+        values[:, first] = vout.real
+        values[:, first + 1] = vout.imag
+        values[:, first + 2] = np.abs(vout)
+        values[:, first + 3] = np.degrees(np.angle(vout))
+    values[:, 11] = np.abs(vout) * 0.02 * frequency / start
+    values[:, 12] = values[:, 11]
+    values[:, 13] = 90.0
+    values[:, 18] = timer_start + np.cumsum(rng.uniform(1.3, 1.5, points))
+    return values
+
+# Function to write a sweep the way the lock-in exports it: "# " header, tab-separated values with
+# 6 decimals, a trailing tab and CRLF line ends
+def write_text_sweep(path, values):
+    with open(path, "w", newline="") as file:
+        file.write("# " + "\t".join(COLUMNS) + "\t\r\n")
+        np.savetxt(file, values, fmt="%.6f", delimiter="\t ", newline="\t\r\n")
+
+# Function to write scale times the current raw_data as synthetic sweeps into out_dir; every
+# measurement gets all three bands, so each one is a complete group for combine_freq.
+# Returns the number of files written.
+def generate(out_dir, scale=1.0, seed=0, hdf5=False):
+    os.makedirs(out_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    labels = {column: label for column, label in zip(COLUMNS, LABELS)}
+    written, taken = 0, set()
+    for measurement in range(int(round(BASE_MEASUREMENTS * scale))):
+        day = measurement // MEASUREMENTS_PER_DAY
+        date = FIRST_DATE + datetime.timedelta(days=day)
+        # Draw again until the filename is new for the day
+        while True:
+            draw = tuple(str(rng.choice(choices)) for choices in (CHEMISTRIES, PIXELS, CONFIGURATIONS, OFFSETS, AMPLITUDES))
+            if (day, draw) not in taken:
+                taken.add((day, draw))
+                break
+        chemistry, pixel, configuration, offset, amplitude = draw
+        timer = rng.uniform(5e4, 3e5)
+        for band, start, stop, points in BANDS:
+            values = simulate_band(rng, start, stop, points, cutoff_frequency(configuration), float(amplitude), timer)
+            timer = values[-1, 18]
+            stem = (
+                f"{date:%Y-%m-%d}_{chemistry}-{pixel}_{configuration}-config_{day + 1}daydeg_"
+                f"{band}_{points}p-1s_{offset}offset_{amplitude}Vpk"
+            )
+            write_text_sweep(os.path.join(out_dir, f"{stem}.txt"), values)
+            written += 1
+            if hdf5:
+                write_sweep(os.path.join(out_dir, f"{stem}.hdf5"), pd.DataFrame(values, columns=COLUMNS), "hdf5", labels)
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic sweep archive in the raw_data file format")
+    parser.add_argument("out_dir")
+    parser.add_argument("--scale", type=float, default=1.0, help="size relative to the current raw_data (549 files)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hdf5", action="store_true", help="also write an .hdf5 twin of every sweep")
+    args = parser.parse_args()
+
+    written = generate(args.out_dir, args.scale, args.seed, args.hdf5)
+    print(f"Wrote {written} sweeps to {args.out_dir}")
+
+if __name__ == "__main__":
+    main()
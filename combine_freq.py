@@ -1,129 +1,298 @@
+import argparse
+import json
 import os
 import re
+import uuid
+
 import pandas as pd
-from collections import defaultdict
-from datetime import datetime
-
-# Setup folder path
-base_path = os.path.dirname(os.path.abspath(__file__))
-raw_data_path = os.path.join(base_path, "raw_data")
-
-# Function to parse filenames
-def parse_filename(filename):
-    pattern = re.compile(
-        r"(?P<date>\d{4}-\d{2}-\d{2})_"  
-        r"(?P<device_chemistry>[^-]+)-"  
-        r"(?P<device_pixel>[^_]+)_"  
-        r"(?P<device_configuration>.+?)-config_"  
-        r"(?P<device_degradation>[^_]+)_"  
-        r"(?P<frequency_range>[^_]+)_"  
-        r"(?P<datapoint_capture>[^_]+)_"  
-        r"(?P<voltage_offset>[^_]+)_"  
-        r"(?P<voltage_amplitude>[^V]+)Vpk"  
-    )
-    match = pattern.match(filename)
-    if match:
-        return match.groupdict()
-    return None
 
-# Function to load data from a txt file in raw_data
-def load_data(filename):
-    filepath = os.path.join(raw_data_path, filename)
-    with open(filepath, "r") as file:
-        lines = file.readlines()
-    
-    header_line = next((line.lstrip("# ").strip() for line in lines if line.startswith("#")), None)
-    df = pd.read_csv(filepath, delim_whitespace=True, comment="#", names=header_line.split("\t"))
-    return df
-
-# Combine dataframes, averaging duplicate frequencies
-def combine_dataframes(dfs):
-    combined_df = pd.concat(dfs, ignore_index=True)
-    combined_df = combined_df.groupby("Oscilator_frequency (Hz)", as_index=False).mean()
-    combined_df.sort_values(by="Oscilator_frequency (Hz)", inplace=True)
-    return combined_df
-
-# Function to sum integers in datapoint_capture strings
+from sweep_cache import SWEEP_SUFFIXES
+from sweep_catalog import group_files, parse_filename
+from sweep_engine import DEFAULT_DATA_DIR, SweepEngine
+from sweep_merge import ascending, merge_sweeps
+from sweep_reader import hdf5_twin, read_data_names
+from sweep_writer import CONSOLIDATED_FORMATS, OUTPUT_FORMATS, write_consolidated, write_sweep
+
+# Setup folder path (SWEEP_DATA_DIR overrides it)
+raw_data_path = DEFAULT_DATA_DIR
+
+# Metadata a stitched sweep is keyed on; its frequency ranges are combined into one file
+group_fields = ["device_chemistry", "device_pixel", "device_configuration", "voltage_offset", "voltage_amplitude"]
+
+# Frequency ranges a group needs before it is stitched
+required_ranges = {"500k-5kHz", "5k-200Hz", "200-1Hz"}
+
+# Points per decade of the canonical log grid the sweeps are aligned on before stitching;
+# 0 keeps the measured frequencies, as in the stitched files already in the archive
+grid_density = 0
+
+# File in the output directory recording the inputs each output was built from
+manifest_name = ".combine_freq.json"
+
+# Function to load files at once into a sweep cube, through the sweep cache shared with the dashboard
+# (each sweep comes from its txt file, or its hdf5 twin with SWEEP_PREFER_HDF5=1)
+def load_all_data(engine, catalog, files, density=grid_density):
+    cube = engine.load(catalog.loc[files], density=density)
+    for file, source in cube.metadata["source"].items():
+        print(f"Loaded {file} from {source}")
+    return cube
+
+# Combine sweeps of a cube, averaging duplicate frequencies (sorted by ascending frequency).
+# Each sweep is already monotonic in frequency, so they are merged in one pass instead of re-sorted
+def combine_sweeps(cube, rows):
+    frequency = cube.channel_index["Oscilator_frequency (Hz)"]
+    merged = merge_sweeps([ascending(cube.points(row), frequency) for row in rows], frequency)
+    return pd.DataFrame(merged, columns=cube.channels)
+
+# Function to sum every integer in the datapoint_capture tokens (points and dwell), as the
+# stitched files already in the archive count them
 def sum_datapoint_capture(datapoint_captures):
     total = 0
     for dc in datapoint_captures:
-        numbers = re.findall(r"\d+", dc)
+        numbers = re.findall(r"\d+", str(dc))
         total += sum(int(num) for num in numbers)
     return total
 
-# Function to find the highest number in device_degradation strings
+# Function to find the highest number in device_degradation tokens (0 when none has a number)
 def find_highest_degradation(device_degradations):
     highest = 0
     for dd in device_degradations:
-        numbers = re.findall(r"\d+", dd)
+        numbers = re.findall(r"\d+", str(dd))
         if numbers:
             highest = max(highest, max(int(num) for num in numbers))
     return highest
 
-# Get all .txt files in the directory
-txt_files = [f for f in os.listdir(raw_data_path) if f.endswith(".txt")]
-
-# Parse filenames and organize data
-parsed_files = {file: parse_filename(file) for file in txt_files if parse_filename(file)}
-
-# Print parsed files for debugging
-print("Parsed files:")
-for file, characteristics in parsed_files.items():
-    print(f"File: {file}, Date: {characteristics['date']}, Frequency Range: {characteristics['frequency_range']}, Datapoint Capture: {characteristics['datapoint_capture']}, Device Degradation: {characteristics['device_degradation']}")
-
-# Group files by relevant characteristics
-grouped_files = defaultdict(list)
-for file, characteristics in parsed_files.items():
-    key = tuple((k, v) for k, v in characteristics.items() if k not in {"frequency_range", "datapoint_capture", "device_degradation", "date"})
-    grouped_files[key].append(file)
-
-print("\nGrouped files:")
-for key, files in grouped_files.items():
-    print(f"Group Key: {key}, Files: {files}")
-
-# Combine data per group
-for key, files in grouped_files.items():
-    required_ranges = {"500k-5kHz", "5k-200Hz", "200-1Hz"}
-    frequency_ranges = [parsed_files[file]["frequency_range"] for file in files]
-
-    print(f"\nGroup Key: {key}")
-    print(f"Frequency Ranges: {frequency_ranges}")
-
-    if set(frequency_ranges) == required_ranges:
-        print(f"Found required frequency ranges: {required_ranges}")
-        dfs = [load_data(file) for file in files]
-        combined_df = combine_dataframes(dfs)
-
-        characteristics = dict(key)
-        datapoint_captures = [parsed_files[file]["datapoint_capture"] for file in files]
-        total_datapoint_capture = sum_datapoint_capture(datapoint_captures)
-
-        dates = [parsed_files[file]["date"] for file in files]
-        newest_date = max(dates, key=lambda x: datetime.strptime(x, "%Y-%m-%d"))
-
-        device_degradations = [parsed_files[file]["device_degradation"] for file in files]
-        highest_degradation = find_highest_degradation(device_degradations)
-
-        combined_freq_range = "500k-1Hz"
-
-        new_filename = (
-            f"{newest_date}_"
-            f"{characteristics['device_chemistry']}-{characteristics['device_pixel']}_"
-            f"{characteristics['device_configuration']}-config_"
-            f"{highest_degradation}daydeg_"
-            f"{combined_freq_range}_"
-            f"{total_datapoint_capture}p-1s_"
-            f"{characteristics['voltage_offset']}_"
-            f"{characteristics['voltage_amplitude']}Vpk.txt"
-        )
+# Function to name the stitched file of a group from the metadata of its files
+def output_filename(key, group):
+    characteristics = dict(zip(group_fields, key))
+    total_datapoint_capture = sum_datapoint_capture(group["datapoint_capture"])
+    newest_date = group["date"].max().strftime("%Y-%m-%d")
+    highest_degradation = find_highest_degradation(group["device_degradation"])
+
+    combined_freq_range = "500k-1Hz"
+
+    return (
+        f"{newest_date}_"
+        f"{characteristics['device_chemistry']}-{characteristics['device_pixel']}_"
+        f"{characteristics['device_configuration']}-config_"
+        f"{highest_degradation}daydeg_"
+        f"{combined_freq_range}_"
+        f"{total_datapoint_capture}p-1s_"
+        f"{characteristics['voltage_offset']}_"
+        f"{characteristics['voltage_amplitude']}Vpk.txt"
+    )
+
+# Function to read the record of what each output in output_dir was built from
+def read_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, manifest_name)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+# Function to store the output records, replacing the previous file atomically
+def write_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, manifest_name)
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(temp_path, path)
+
+# Function to tell why an output has to be rebuilt, or None when it is up to date.
+# inputs maps each input file to its content hash; record is what the output was last built from.
+# An output with no record (written before outputs were tracked) is up to date when it is newer
+# than every file it reads, as make would decide.
+def stale_reason(output_path, record, inputs, settings, engine):
+    if not os.path.exists(output_path):
+        return "missing"
+    if record is not None:
+        if record.get("settings") != settings:
+            return "settings changed"
+        if record.get("inputs") != inputs:
+            return "inputs changed"
+        return None
+    output_mtime = os.stat(output_path).st_mtime_ns
+    for file in inputs:
+        if any(os.stat(path).st_mtime_ns > output_mtime for path in engine.source_files(file)):
+            return "newer inputs"
+    return None
+
+# Function to get the Data_name labels (device and description of each column) from the first
+# input that has an .hdf5 twin, so binary outputs carry the same labels; None if there is none
+def column_labels(data_dir, files):
+    for file in files:
+        twin = hdf5_twin(os.path.join(data_dir, file))
+        if twin is not None:
+            try:
+                return read_data_names(twin)
+            except (ImportError, OSError, KeyError):
+                pass
+    return None
+
+# Function to get the group keys of some file names (names that do not parse are left out)
+def group_keys(names):
+    keys = set()
+    for name in names:
+        characteristics = parse_filename(name)
+        if characteristics:
+            keys.add(tuple(characteristics[field] for field in group_fields))
+    return keys
+
+# Function to stitch every complete group of args.data_dir, or with keys only the groups with those keys
+# (a consolidated output always holds every group, so keys does not narrow it down). Groups in busy
+# have a file still being written, so none of their files is read, not even into the cache.
+def combine(args, keys=None, busy=()):
+    formats = args.formats
+    output_dir = args.output_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Build the metadata catalog of all .txt files in the directory
+    engine = SweepEngine(args.data_dir)
+    catalog = engine.scan()
+    if busy:
+        catalog = catalog.loc[[file for key, files in group_files(catalog, group_fields).items() if key not in busy for file in files]]
+    if keys is not None and not args.consolidate:
+        catalog = catalog.loc[[file for key, files in group_files(catalog, group_fields).items() if key in keys for file in files]]
+
+    # Print parsed files for debugging
+    print("Parsed files:")
+    for file, characteristics in catalog.iterrows():
+        print(f"File: {file}, Date: {characteristics['date']:%Y-%m-%d}, Frequency Range: {characteristics['frequency_range']}, Datapoint Capture: {characteristics['datapoint_capture']}, Device Degradation: {characteristics['device_degradation']}")
 
-        # Write the new file to current directory
-        with open(new_filename, "w") as new_file:
-            new_file.write("# " + "\t".join(combined_df.columns) + "\n")
-            combined_df.to_csv(new_file, sep="\t", index=False, header=False)
+    # Group files by relevant characteristics
+    grouped_files = group_files(catalog, group_fields)
 
-        print(f"Created new file: {new_filename}")
+    print("\nGrouped files:")
+    for key, files in grouped_files.items():
+        print(f"Group Key: {dict(zip(group_fields, key))}, Files: {files}")
+
+    # Find the groups that cover the required frequency ranges, with the content hash of each input
+    complete = {}
+    for key, files in grouped_files.items():
+        group = catalog.loc[files]
+        frequency_ranges = list(group["frequency_range"])
+
+        print(f"\nGroup Key: {dict(zip(group_fields, key))}")
+        print(f"Frequency Ranges: {frequency_ranges}")
+
+        if set(frequency_ranges) == required_ranges:
+            print(f"Found required frequency ranges: {required_ranges}")
+            stem = os.path.splitext(output_filename(key, group))[0]
+            complete[key] = (files, stem, engine.content_keys(files))
+        else:
+            print(f"Skipping group: Required frequency ranges not found.")
+
+    # One output per group and format, or with --consolidate one per format holding every group
+    # (nothing is consolidated while no group is complete)
+    if args.consolidate:
+        targets = {f"{args.consolidate}{OUTPUT_FORMATS[output_format]}": (output_format, list(complete)) for output_format in formats if complete}
+        if not complete:
+            print(f"\nNo complete groups to consolidate into {args.consolidate}.")
     else:
-        print(f"Skipping group: Required frequency ranges not found.")
+        targets = {
+            f"{stem}{OUTPUT_FORMATS[output_format]}": (output_format, [key])
+            for key, (_, stem, _) in complete.items() for output_format in formats
+        }
+
+    # Decide which outputs have to be rebuilt: those that are missing, or whose inputs changed
+    manifest = read_manifest(output_dir)
+    settings = {"grid_density": args.grid_density}
+    stale = {}
+    print()
+    for name, (output_format, keys) in targets.items():
+        inputs = {file: digest for key in keys for file, digest in complete[key][2].items()}
+        reason = "forced" if args.force else stale_reason(
+            os.path.join(output_dir, name), manifest.get(name), inputs, settings, engine
+        )
+        if reason is None:
+            print(f"Up to date: {name}")
+            manifest.setdefault(name, {"inputs": inputs, "settings": settings})
+        elif args.dry_run:
+            print(f"Would rebuild {name} ({reason})")
+        else:
+            stale[name] = (output_format, keys, inputs)
+
+    if stale:
+        # Load every file of the groups to rebuild in one go and stitch each group once
+        keys = list(dict.fromkeys(key for _, group_keys, _ in stale.values() for key in group_keys))
+        files = [file for key in keys for file in complete[key][0]]
+        loaded_cube = load_all_data(engine, catalog, files, args.grid_density)
+        combined = {key: combine_sweeps(loaded_cube, loaded_cube.rows(complete[key][0])) for key in keys}
+        labels = column_labels(args.data_dir, files) if any(output_format in ("npz", "hdf5") for output_format, _, _ in stale.values()) else None
+
+        # Write the new files to the output directory
+        for name, (output_format, group_keys, inputs) in stale.items():
+            path = os.path.join(output_dir, name)
+            if args.consolidate:
+                write_consolidated(path, {complete[key][1]: combined[key] for key in group_keys}, output_format, labels)
+            else:
+                write_sweep(path, combined[group_keys[0]], output_format, labels)
+            manifest[name] = {"inputs": inputs, "settings": settings}
+
+            print(f"Created new file: {name}")
+
+    if not args.dry_run:
+        # Forget outputs that no longer exist
+        manifest = {name: record for name, record in manifest.items() if os.path.exists(os.path.join(output_dir, name))}
+        write_manifest(output_dir, manifest)
+        print(f"\n{len(stale)} files written.")
+
+        # Parse the sweeps no group needed too, so the dashboard finds the whole archive in the cache
+        parsed = engine.warm(catalog.index)
+        if parsed:
+            print(f"{parsed} more sweeps parsed into the shared cache.")
+    print("\nProcessing complete.")
+
+# Function to keep stitching as sweeps arrive: once a new .txt or .hdf5 has settled, only the group
+# it belongs to is grouped and stitched again, and only if that makes it complete or changes it.
+# A group with another file still being written (often the next band) waits until that one has
+# settled too, and a batch that fails is reported without stopping the watch.
+def watch_groups(args):
+    from sweep_watch import watch
+
+    print(f"\nWatching {args.data_dir} for new sweeps (Ctrl+C to stop)")
+    waiting = set()
+    for names, busy_names in watch(args.data_dir, args.debounce, SWEEP_SUFFIXES):
+        busy = group_keys(busy_names)
+        keys = group_keys(names) | waiting
+        waiting = keys & busy
+        keys -= busy
+        if waiting:
+            print(f"\nWaiting for files still being written: {', '.join(busy_names)}")
+        if keys:
+            print(f"\nSettled: {', '.join(names)}")
+            try:
+                combine(args, keys, busy)
+            except Exception as error:
+                print(f"\nFailed to stitch {', '.join(names)}: {type(error).__name__}: {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Stitch the frequency ranges of every sweep group into one 500k-1Hz file")
+    parser.add_argument("--data-dir", default=raw_data_path)
+    parser.add_argument("--output-dir", default=".", help="where stitched files are written (default: the current directory)")
+    parser.add_argument("--format", action="append", choices=list(OUTPUT_FORMATS), dest="formats",
+                        help="output format; repeat to write several (default: txt)")
+    parser.add_argument("--consolidate", metavar="NAME",
+                        help=f"write every group into one NAME file per format instead of one file per group ({', '.join(CONSOLIDATED_FORMATS)} only)")
+    parser.add_argument("--force", action="store_true", help="rebuild every group, even when its output is up to date")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="list the groups that would be rebuilt and why, without writing")
+    parser.add_argument("--grid-density", type=int, default=grid_density,
+                        help="align sweeps on a log grid with this many points per decade (0 keeps measured frequencies)")
+    parser.add_argument("--watch", action="store_true",
+                        help="after the first run, keep watching the data directory and stitch each group as soon as it is complete")
+    parser.add_argument("--debounce", type=float,
+                        help="seconds a new file must stay unchanged before it is read (watch mode; default: SWEEP_WATCH_DEBOUNCE or 2)")
+    args = parser.parse_args()
+    args.formats = list(dict.fromkeys(args.formats or ["txt"]))
+    if args.consolidate and any(output_format not in CONSOLIDATED_FORMATS for output_format in args.formats):
+        parser.error(f"--consolidate needs a --format of {', '.join(CONSOLIDATED_FORMATS)}")
+
+    combine(args)
+    if args.watch:
+        try:
+            watch_groups(args)
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
 
-print("\nProcessing complete.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
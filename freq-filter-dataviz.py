@@ -1,93 +1,194 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
 import os
-import re
-
-# Setup folder path
-base_path = os.path.dirname(os.path.abspath(__file__))
-raw_data_path = os.path.join(base_path, "raw_data")
-
-# Function to parse filenames
-def parse_filename(filename):
-    pattern = re.compile(
-        r"(?P<date>\d{4}-\d{2}-\d{2})_"  
-        r"(?P<device_chemistry>[^-]+)-"  
-        r"(?P<device_pixel>[^_]+)_"  
-        r"(?P<device_configuration>.+?)-config_"  
-        r"(?P<device_degradation>[^_]+)_"  
-        r"(?P<frequency_range>[^_]+)_"  
-        r"(?P<datapoint_capture>[^_]+)_"  
-        r"(?P<voltage_offset>[^_]+)_"  
-        r"(?P<voltage_amplitude>[^V]+)Vpk"  
-    )
-    match = pattern.match(filename)
-    if match:
-        return match.groupdict()
-    return None
-
-# Function to load data from a txt file
-def load_data(filename):
-    full_path = os.path.join(raw_data_path, filename)
-    with open(full_path, "r") as file:
-        lines = file.readlines()
-
-    header_line = next((line.lstrip("# ").strip() for line in lines if line.startswith("#")), None)
-    df = pd.read_csv(full_path, delim_whitespace=True, comment="#", names=header_line.split("\t"))
-    return df
-
-# Get all .txt files in the directory
-txt_files = [f for f in os.listdir(raw_data_path) if f.endswith(".txt")]
-
-# Parse filenames and organize data
-parsed_files = {file: parse_filename(file) for file in txt_files if parse_filename(file)}
-
-def group_data():
-    grouped_data = {}
-
-    for file, metadata in parsed_files.items():
-        # Group by all metadata except a few
-        key = tuple(metadata[k] for k in metadata if k not in [
-            "device_chemistry", "date", "device_degradation", "device_pixel", "voltage_amplitude"
-        ])
-        df = load_data(file)
-        df["voltage_amplitude"] = float(metadata["voltage_amplitude"])
-        df["device_chemistry"] = metadata["device_chemistry"]
-
-        df["Normalized_Vout (%)"] = (df["Demod_4_X_A (V)"] / (df["voltage_amplitude"] / 1.4142)) * 100
-
-        if key in grouped_data:
-            grouped_data[key].append(df)
-        else:
-            grouped_data[key] = [df]
-
-    # === Compute mean and std ===
-    grouped_results = {}
-    for key, dfs in grouped_data.items():
-        combined_df = pd.concat(dfs, ignore_index=True)
-        combined_df["Oscilator_frequency (Hz)"] = pd.to_numeric(combined_df["Oscilator_frequency (Hz)"], errors="coerce")
-
-        numeric_cols = combined_df.select_dtypes(include=["number"]).columns
-
-        mean_df = combined_df.groupby(["device_chemistry", "voltage_amplitude", "Oscilator_frequency (Hz)"])[numeric_cols].mean()
-        std_df = combined_df.groupby(["device_chemistry", "voltage_amplitude", "Oscilator_frequency (Hz)"])[numeric_cols].std()
-
-        grouped_results[key] = (mean_df, std_df)
-
-    return grouped_results
-
-grouped_results = group_data()
+import threading
+from importlib.machinery import ModuleSpec
+
+from sweep_cache import DEFAULT_CACHE_DIR
+from sweep_catalog import build_facet_index, build_key_index, group_files
+from sweep_engine import DEFAULT_DATA_DIR, SweepEngine
+from sweep_grid import DEFAULT_ALIGN_METHOD, DEFAULT_DENSITY
+from sweep_figures import DEFAULT_MAX_POINTS, DEFAULT_WEBGL_THRESHOLD, FigureCache, sweep_trace
+from sweep_stats import load_stats, save_stats, update_stats
+from sweep_timing import StageTimer
+
+# Setup folder path (SWEEP_DATA_DIR overrides it); scanning, parsing and the sweep cache are
+# shared with combine_freq.py through the sweep engine
+raw_data_path = DEFAULT_DATA_DIR
+# Cache misses are parsed on the process pool of sweep_reader.load_sweeps, which scales with the
+# core count. Its workers are started by a forkserver, so the Streamlit server is never forked.
+# A new worker imports the __main__ of the process that started it, and Streamlit installs this
+# script as __main__; a __spec__ named "__main__" is one multiprocessing leaves alone (as for
+# python -m), so the workers only import sweep_reader and never run the dashboard.
+__spec__ = ModuleSpec("__main__", None)
+engine = SweepEngine(raw_data_path)
+
+# Wall-clock time of each stage of this run, shown in the sidebar with ?debug=1 (or DASHBOARD_DEBUG=1)
+# and logged as JSON lines either way
+timer = StageTimer()
+
+# Metadata a dashboard group is keyed on; chemistry and amplitude are overlaid inside each group
+group_fields = ["device_configuration", "frequency_range", "datapoint_capture", "voltage_offset"]
+
+# Sidebar filters that narrow down the group keys
+filter_fields = ["voltage_offset", "device_configuration"]
+
+# Rows each group's mean and std are computed over
+overlay_levels = ["device_chemistry", "voltage_amplitude", "Oscilator_frequency (Hz)"]
+
+# Axes plotted by default; only these channels are aggregated up front, any other channel is
+# aggregated the first time it is picked as the Y-axis variable
+x_column = "Oscilator_frequency (Hz)"
+default_y_column = "Demod_4_X_A (V)"
+
+# Columns derived from a sweep's channels and catalog row, with the channels each one needs
+derived_columns = {"voltage_amplitude": [], "Normalized_Vout (%)": ["Demod_4_X_A (V)"]}
+
+# Where the per-group statistics are kept between runs, and what they were built from
+stats_path = os.path.join(DEFAULT_CACHE_DIR, "dashboard_stats.pkl")
+stats_layout = {
+    "group_fields": group_fields, "overlay_levels": overlay_levels,
+    "grid": {"density": DEFAULT_DENSITY, "method": DEFAULT_ALIGN_METHOD},
+}
+
+# Function to build the metadata catalog of all .txt files in the directory
+# (cached per fingerprint of raw_data, so it only runs again when files are added or changed)
+@st.cache_data(max_entries=1)
+def scan_files(fingerprint):
+    return engine.scan()
+
+# Function to index the catalog once per scan: files per metadata facet, and group keys per sidebar filter
+@st.cache_resource(max_entries=1)
+def index_files(fingerprint):
+    catalog = scan_files(fingerprint)
+    return build_facet_index(catalog), build_key_index(catalog, filter_fields, group_fields)
+
+# Function to list the channels, derived columns included, that can be plotted
+@st.cache_data(max_entries=1)
+def list_columns(fingerprint):
+    columns = engine.columns(scan_files(fingerprint))
+    return columns + list(derived_columns) if columns else []
+
+# Function to list the sweep channels needed to prepare some columns (the frequency is always read, as a level)
+def source_channels(columns):
+    channels = [x_column]
+    for column in columns:
+        channels += derived_columns.get(column, [column])
+    return list(dict.fromkeys(channels))
+
+# Function to prepare the sweeps of a cube for aggregation: the overlay levels of each point and
+# the requested columns, sweep channels first and derived columns after
+def prepare_sweeps(cube, columns):
+    frequency = cube.channel_index[x_column]
+    channels = [column for column in columns if column in cube.channel_index]
+    derived = [column for column in columns if column in derived_columns]
+    channel_positions = [cube.channel_index[column] for column in channels]
+
+    prepared = {}
+    metadata = cube.metadata
+    for row, (file, chemistry, amplitude) in enumerate(zip(metadata.index, metadata["device_chemistry"], metadata["amplitude_v"])):
+        points = cube.points(row)
+        voltage_amplitude = np.full(len(points), amplitude)
+        values = {"voltage_amplitude": voltage_amplitude}
+        if "Normalized_Vout (%)" in derived:
+            values["Normalized_Vout (%)"] = (points[:, cube.channel_index["Demod_4_X_A (V)"]] / (voltage_amplitude / 1.4142)) * 100
+        levels = [np.full(len(points), chemistry, dtype=object), voltage_amplitude, points[:, frequency]]
+        prepared[file] = (levels, channels + derived, np.column_stack([points[:, channel_positions]] + [values[column] for column in derived]))
+    return prepared
+
+# Function to load some sweeps and prepare the given columns of each (None for every column).
+# Each sweep comes from its txt file (or its hdf5 twin with SWEEP_PREFER_HDF5=1); misses are
+# parsed on the SWEEP_WORKERS / SWEEP_EXECUTOR pool, see sweep_reader.load_sweeps.
+# A group's sweeps share band and capture, so they are averaged at their measured frequencies;
+# SWEEP_GRID_DENSITY puts them on a canonical log grid first (see sweep_grid)
+def load_prepared(files, columns, progress=None):
+    channels = source_channels(columns) if columns is not None else None
+    cube = engine.load(catalog.loc[files], columns=channels, progress=progress)
+    return prepare_sweeps(cube, columns if columns is not None else cube.channels + list(derived_columns))
+
+# Function to aggregate every sweep, keyed the same way as scan_files.
+# Per-group sufficient statistics persist in the sweep cache directory, so a new fingerprint
+# only loads the sweeps that were added and rebuilds the groups that lost or changed one.
+# (cache_resource hands back the same objects on every rerun instead of unpickling a copy; they are
+# only changed by materialize_columns, under stats_lock)
+@st.cache_resource(max_entries=1, show_spinner="Loading sweeps...")
+def group_data(fingerprint):
+    members = {key: engine.content_keys(files) for key, files in group_files(catalog, group_fields).items()}
+    grouped_results = load_stats(stats_path, stats_layout)
+
+    # Show a progress bar while sweeps that are not in the on-disk cache get parsed
+    loading_status = st.empty()
+    def show_loading_progress(done, total):
+        loading_status.progress(done / total, text=f"Parsing sweeps: {done}/{total}")
+    def load_group_sweeps(files, columns):
+        with timer.stage("load sweeps"):
+            return load_prepared(files, columns, progress=show_loading_progress)
+    with timer.stage("aggregate"):
+        changed = update_stats(grouped_results, members, load_group_sweeps, overlay_levels, [x_column, default_y_column])
+    if changed:
+        save_stats(stats_path, stats_layout, grouped_results)
+    loading_status.empty()
+
+    load_sources = engine.sources(catalog.index)
+    engine.cache.save()
+    return grouped_results, load_sources
+
+# Lock serializing the sessions that add channels to the shared group statistics
+@st.cache_resource
+def stats_lock():
+    return threading.Lock()
+
+# Figures built this server session, shared by all sessions
+@st.cache_resource
+def figure_cache():
+    return FigureCache()
+
+# Function to get a group's statistics with the given columns aggregated, aggregating any of
+# them that the group does not hold yet and storing the result for the next run.
+# The check outside the lock is only a fast path: a channel shows up in group.columns once it is
+# fully aggregated (see GroupStats.materialize), and materialize checks again under the lock, so
+# a session that waited for another one aggregating the same channel does not aggregate it twice.
+def materialize_columns(key, columns):
+    group = grouped_results[key]
+    if any(column not in group.columns for column in columns):
+        with stats_lock(), st.spinner("Aggregating channel..."):
+            if group.materialize(columns, lambda files, missing: load_prepared(files, missing)):
+                save_stats(stats_path, stats_layout, grouped_results)
+    return group
+
+# Parse and aggregate raw_data, reusing the cached results until its contents change
+# (the load and aggregate stages only show up on the run that misses the cache)
+with timer.stage("directory scan"):
+    raw_data_fingerprint = engine.fingerprint()
+with timer.stage("filename parsing"):
+    catalog = scan_files(raw_data_fingerprint)
+    facet_index, key_index = index_files(raw_data_fingerprint)
+with timer.stage("group data"):
+    grouped_results, load_sources = group_data(raw_data_fingerprint)
+available_columns = list_columns(raw_data_fingerprint)
 
 # Streamlit UI
 # Optional title
 # st.title("Vout (V) vs Frequency (Hz) Graph")
 
-# Create two tabs
-tab_chemistry, tab_voltage = st.tabs(["Tab Chemistry", "Tab Voltage"])
+# Pick one view; unlike st.tabs, only the selected view's widgets and figure are built and sent
+views = ["Tab Chemistry", "Tab Voltage"]
+active_view = st.radio("View", views, horizontal=True, label_visibility="collapsed", key="active_view")
 
-# Extract unique voltage offsets and device configurations from parsed files
-available_voltage_offsets = sorted(list(set(metadata["voltage_offset"] for metadata in parsed_files.values())))
-available_device_configurations = sorted(list(set(metadata["device_configuration"] for metadata in parsed_files.values())))
+# Widgets of the hidden view are not rendered, and Streamlit drops the state of widgets that are
+# not rendered; writing it back keeps each view's selections while the other one is shown
+view_widget_keys = [
+    "chemistry_multiselect", "chemistry_voltage", "chemistry_y_column", "chemistry_log_scale",
+    "voltage_chemistry", "voltage_multiselect", "voltage_y_column", "voltage_log_scale",
+]
+for key in view_widget_keys:
+    if key in st.session_state:
+        st.session_state[key] = st.session_state[key]
+
+# Extract unique voltage offsets and device configurations from the facet index
+available_voltage_offsets = sorted(facet_index["voltage_offset"])
+available_device_configurations = sorted(facet_index["device_configuration"])
 
 # Add a filter for voltage_offset
 selected_voltage_offset = st.sidebar.radio(
@@ -104,15 +205,8 @@ selected_device_configuration = st.sidebar.radio(
 )
 
 # Filter unique_keys based on the selected voltage_offset and device_configuration
-filtered_keys = [
-    key for key in grouped_results.keys() 
-    if any(
-        metadata["voltage_offset"] == selected_voltage_offset 
-        and metadata["device_configuration"] == selected_device_configuration
-        for file, metadata in parsed_files.items() 
-        if key == tuple(metadata[k] for k in metadata if k not in ["device_chemistry", "date", "device_degradation", "device_pixel", "voltage_amplitude"])
-    )
-]
+with timer.stage("filter"):
+    filtered_keys = key_index.get((selected_voltage_offset, selected_device_configuration), [])
 
 # Dropdown for selecting a device configuration (shared across tabs)
 selected_key = st.sidebar.selectbox(
@@ -121,37 +215,30 @@ selected_key = st.sidebar.selectbox(
     key="device_configuration_dropdown"
 )
 
+# Report which path the sweeps were loaded from
+source_counts = pd.Series(load_sources, dtype=object).value_counts()
+st.sidebar.caption(", ".join(f"{count} sweeps from {source}" for source, count in source_counts.items()))
+
 # Add a checkbox to toggle error bars
 show_error_bars = st.sidebar.checkbox("Show Error Bars", value=True, key="error_bars_toggle")
 
-# Define the required frequency ranges
-required_frequency_ranges = {"500k-5kHz", "5k-200Hz", "200-1Hz"}
-
-# Group files by metadata (excluding 'date', 'device_degradation', 'datapoint_capture', and 'frequency_range')
-# Also, track which groups have the required frequency ranges
-grouped_files = {}
-group_combine_frequencies = {}  # Dictionary to track which groups can combine frequencies
-
-for file, metadata in parsed_files.items():
-    # Create a key based on the relevant metadata
-    key = tuple(metadata[k] for k in metadata if k not in ["date", "device_degradation", "datapoint_capture", "frequency_range"])
-    
-    # Add the file to the corresponding group
-    if key in grouped_files:
-        grouped_files[key].append(file)
-    else:
-        grouped_files[key] = [file]
-
+# Add a checkbox to downsample long traces (shape-preserving, see sweep_figures.lttb)
+max_points = DEFAULT_MAX_POINTS if st.sidebar.checkbox(
+    f"Downsample Traces to {DEFAULT_MAX_POINTS} Points", value=False, key="downsample_toggle"
+) else 0
 
 if selected_key:
-    mean_df, std_df = grouped_results[selected_key]
+    mean_df, std_df = grouped_results[selected_key].summary()
     
     # Extract unique device chemistries and voltage amplitudes
     available_chemistries = mean_df.index.get_level_values("device_chemistry").unique()
     available_voltages = mean_df.index.get_level_values("voltage_amplitude").unique()
 
-    # Tab Chemistry
-    with tab_chemistry:
+    # Channels offered as the Y-axis variable
+    filtered_columns = [col for col in available_columns if not (col.startswith("Demod_1") or col.startswith("DemodAll"))]
+
+    # View Chemistry
+    if active_view == "Tab Chemistry":
         # Optional title
         # st.header("Tab Chemistry: Overlay by Device Chemistry")
         
@@ -167,55 +254,65 @@ if selected_key:
         selected_voltage = st.radio("Choose Voltage Amplitude:", available_voltages, key="chemistry_voltage")
     
         # Dropdown for selecting Y-axis variable
-        x_column = "Oscilator_frequency (Hz)"
-        default_y_column = "Demod_4_X_A (V)"
-        filtered_columns = [col for col in mean_df.columns if not (col.startswith("Demod_1") or col.startswith("DemodAll"))]
         y_column = st.selectbox("Select Y-axis Variable", filtered_columns, index=filtered_columns.index(default_y_column) if default_y_column in filtered_columns else 0, key="chemistry_y_column")
     
         # Checkbox for logarithmic x-axis
         use_log_scale = st.checkbox("Use Logarithmic X-axis", value=False, key="chemistry_log_scale")
     
-        # Create a Plotly figure
-        fig_chemistry = px.scatter()
-    
-        # Add traces for each selected device chemistry
-        for chemistry in selected_chemistries:
-            # Filter data for selected chemistry and voltage
-            mean_df_selected = mean_df.xs((chemistry, selected_voltage), level=["device_chemistry", "voltage_amplitude"])
-            std_df_selected = std_df.xs((chemistry, selected_voltage), level=["device_chemistry", "voltage_amplitude"])
-    
-            # Add trace to the figure
-            fig_chemistry.add_scatter(
-                x=mean_df_selected[x_column],
-                y=mean_df_selected[y_column],
-                error_y=dict(
-                    array=std_df_selected[y_column] if show_error_bars else None,  # Toggle error bars
-                    visible=show_error_bars  # Toggle error bar visibility
-                ),
-                mode="markers+lines",
-                name=f"{chemistry} ({selected_voltage} Vpk)",
-                line=dict(width=2),
-                marker=dict(size=8)
-            )
-    
-        # Update layout for better visualization
-        fig_chemistry.update_layout(
-            title=f"{y_column} vs {x_column} (Voltage Amplitude: {selected_voltage} Vpk)",
-            xaxis_title="Frequency (Hz)",
-            yaxis_title=y_column,
-            legend_title="Device Chemistry",
-            showlegend=True
-        )
-    
-        # Set x-axis to logarithmic if the checkbox is checked
-        if use_log_scale:
-            fig_chemistry.update_xaxes(type="log")
-    
-        # Show graph
-        st.plotly_chart(fig_chemistry, use_container_width=True)
+        # Build the figure, or reuse the one already drawn for the same group and widget state
+        chemistry_figure_key = (raw_data_fingerprint, "chemistry", selected_key, tuple(selected_chemistries), selected_voltage, y_column, use_log_scale, show_error_bars, max_points)
+        def build_chemistry_figure():
+            import plotly.graph_objects as go
+
+            # Aggregate the Y-axis channel if the group does not hold it yet
+            with timer.stage("chemistry: aggregate channel"):
+                group = materialize_columns(selected_key, [x_column, y_column])
+
+            # Look up the mean and std arrays of each selected chemistry at the selected voltage
+            # (combinations that were never measured are left out)
+            with timer.stage("chemistry: filter"):
+                traces = group.traces()
+                selections = {chemistry: traces[(chemistry, selected_voltage)] for chemistry in selected_chemistries if (chemistry, selected_voltage) in traces}
+                x_position, y_position = group.columns.index(x_column), group.columns.index(y_column)
+
+            with timer.stage("chemistry: figure build"):
+                # Create a Plotly figure
+                fig_chemistry = go.Figure()
+
+                # Add traces for each selected device chemistry, with WebGL once there are many points
+                webgl = sum(min(len(mean[x_position]), max_points or len(mean[x_position])) for mean, _ in selections.values()) > DEFAULT_WEBGL_THRESHOLD
+                for chemistry, (mean, std) in selections.items():
+                    fig_chemistry.add_trace(sweep_trace(
+                        mean[x_position],
+                        mean[y_position],
+                        std[y_position] if show_error_bars else None,  # Toggle error bars
+                        name=f"{chemistry} ({selected_voltage} Vpk)",
+                        webgl=webgl,
+                        max_points=max_points,
+                    ))
+
+                # Update layout for better visualization
+                fig_chemistry.update_layout(
+                    title=f"{y_column} vs {x_column} (Voltage Amplitude: {selected_voltage} Vpk)",
+                    xaxis_title="Frequency (Hz)",
+                    yaxis_title=y_column,
+                    legend_title="Device Chemistry",
+                    showlegend=True
+                )
+
+                # Set x-axis to logarithmic if the checkbox is checked
+                if use_log_scale:
+                    fig_chemistry.update_xaxes(type="log")
+
+            return fig_chemistry
+        fig_chemistry = figure_cache().get(chemistry_figure_key, build_chemistry_figure)
+
+        # Show graph (serializes the figure and sends it to the browser)
+        with timer.stage("chemistry: serialize"):
+            st.plotly_chart(fig_chemistry, use_container_width=True)
     
-    # Tab Voltage
-    with tab_voltage:
+    # View Voltage
+    if active_view == "Tab Voltage":
         # Optional title
         # st.header("Tab Voltage: Overlay by Voltage Amplitude")
         
@@ -240,41 +337,61 @@ if selected_key:
         # Checkbox for logarithmic x-axis
         use_log_scale_voltage = st.checkbox("Use Logarithmic X-axis", value=False, key="voltage_log_scale")
     
-        # Create a Plotly figure
-        fig_voltage = px.scatter()
-    
-        # Add traces for each selected voltage amplitude
-        for voltage in selected_voltages:
-            # Filter data for selected chemistry and voltage
-            mean_df_selected = mean_df.xs((selected_chemistry, voltage), level=["device_chemistry", "voltage_amplitude"])
-            std_df_selected = std_df.xs((selected_chemistry, voltage), level=["device_chemistry", "voltage_amplitude"])
-    
-            # Add trace to the figure
-            fig_voltage.add_scatter(
-                x=mean_df_selected[x_column],
-                y=mean_df_selected[y_column_voltage],
-                error_y=dict(
-                    array=std_df_selected[y_column_voltage] if show_error_bars else None,  # Toggle error bars
-                    visible=show_error_bars  # Toggle error bar visibility
-                ),
-                mode="markers+lines",
-                name=f"{selected_chemistry} ({voltage} Vpk)",
-                line=dict(width=2),
-                marker=dict(size=8)
-            )
-    
-        # Update layout for better visualization
-        fig_voltage.update_layout(
-            title=f"{y_column_voltage} vs {x_column} (Device Chemistry: {selected_chemistry})",
-            xaxis_title="Frequency (Hz)",
-            yaxis_title=y_column_voltage,
-            legend_title="Voltage Amplitude",
-            showlegend=True
-        )
-    
-        # Set x-axis to logarithmic if the checkbox is checked
-        if use_log_scale_voltage:
-            fig_voltage.update_xaxes(type="log")
-    
-        # Show graph
-        st.plotly_chart(fig_voltage, use_container_width=True)
\ No newline at end of file
+        # Build the figure, or reuse the one already drawn for the same group and widget state
+        voltage_figure_key = (raw_data_fingerprint, "voltage", selected_key, selected_chemistry, tuple(selected_voltages), y_column_voltage, use_log_scale_voltage, show_error_bars, max_points)
+        def build_voltage_figure():
+            import plotly.graph_objects as go
+
+            # Aggregate the Y-axis channel if the group does not hold it yet
+            with timer.stage("voltage: aggregate channel"):
+                group = materialize_columns(selected_key, [x_column, y_column_voltage])
+
+            # Look up the mean and std arrays of the selected chemistry at each selected voltage
+            # (combinations that were never measured are left out)
+            with timer.stage("voltage: filter"):
+                traces = group.traces()
+                selections = {voltage: traces[(selected_chemistry, voltage)] for voltage in selected_voltages if (selected_chemistry, voltage) in traces}
+                x_position, y_position = group.columns.index(x_column), group.columns.index(y_column_voltage)
+
+            with timer.stage("voltage: figure build"):
+                # Create a Plotly figure
+                fig_voltage = go.Figure()
+
+                # Add traces for each selected voltage amplitude, with WebGL once there are many points
+                webgl = sum(min(len(mean[x_position]), max_points or len(mean[x_position])) for mean, _ in selections.values()) > DEFAULT_WEBGL_THRESHOLD
+                for voltage, (mean, std) in selections.items():
+                    fig_voltage.add_trace(sweep_trace(
+                        mean[x_position],
+                        mean[y_position],
+                        std[y_position] if show_error_bars else None,  # Toggle error bars
+                        name=f"{selected_chemistry} ({voltage} Vpk)",
+                        webgl=webgl,
+                        max_points=max_points,
+                    ))
+
+                # Update layout for better visualization
+                fig_voltage.update_layout(
+                    title=f"{y_column_voltage} vs {x_column} (Device Chemistry: {selected_chemistry})",
+                    xaxis_title="Frequency (Hz)",
+                    yaxis_title=y_column_voltage,
+                    legend_title="Voltage Amplitude",
+                    showlegend=True
+                )
+
+                # Set x-axis to logarithmic if the checkbox is checked
+                if use_log_scale_voltage:
+                    fig_voltage.update_xaxes(type="log")
+
+            return fig_voltage
+        fig_voltage = figure_cache().get(voltage_figure_key, build_voltage_figure)
+
+        # Show graph (serializes the figure and sends it to the browser)
+        with timer.stage("voltage: serialize"):
+            st.plotly_chart(fig_voltage, use_container_width=True)
+
+# Debug panel: how long each stage of this run took
+if st.query_params.get("debug") == "1" or os.environ.get("DASHBOARD_DEBUG") == "1":
+    with st.sidebar.expander("Stage timings"):
+        st.dataframe(timer.frame(), hide_index=True)
+        st.caption(f"Run {timer.run}: {timer.elapsed_ms:.0f} ms in total")
+        st.caption(f"Figure cache: {figure_cache().hits} hits, {figure_cache().misses} misses, {len(figure_cache())}/{figure_cache().size} figures")
@@ -0,0 +1,277 @@
+import argparse
+import hashlib
+import json
+import os
+import uuid
+
+import pandas as pd
+
+from sweep_reader import EXECUTORS, PREFER_HDF5, hdf5_twin, load_sweep, load_sweeps
+
+# Sweep files that make up the dataset
+SWEEP_SUFFIXES = (".txt", ".hdf5")
+
+# Where parsed sweeps are kept between runs (override with SWEEP_CACHE_DIR)
+base_path = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.environ.get("SWEEP_CACHE_DIR", os.path.join(base_path, ".sweep_cache"))
+
+# Archive the tools read by default (override with SWEEP_DATA_DIR); sweep_engine hands it to both entry points
+DEFAULT_DATA_DIR = os.environ.get("SWEEP_DATA_DIR", os.path.join(base_path, "raw_data"))
+
+MANIFEST_VERSION = 1
+
+# Function to fingerprint a data directory from the names, sizes and mtimes of its sweep files
+def directory_fingerprint(path, suffixes=SWEEP_SUFFIXES):
+    digest = hashlib.blake2b(digest_size=16)
+    with os.scandir(path) as entries:
+        stats = sorted(
+            (entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+            for entry in entries
+            if entry.name.endswith(suffixes) and entry.is_file()
+        )
+    for name, size, mtime_ns in stats:
+        digest.update(f"{name}\0{size}\0{mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+# Function to list the files a sweep is read from: the .txt and, when present and PREFER_HDF5 is
+# set, its .hdf5 twin (so turning the switch re-keys every twinned sweep and it is parsed again)
+def source_files(path):
+    twin = hdf5_twin(path) if PREFER_HDF5 else None
+    return [path, twin] if twin else [path]
+
+# On-disk cache of parsed sweeps, keyed by a content hash of their source files.
+#
+# Parsed sweeps live in Feather segments; manifest.json records, for every content hash,
+# the segment and row range holding it. Each load appends at most one new segment, so
+# a warm start is one bulk read of a few segments instead of one parse per sweep.
+# A modified source hashes to a new key and is parsed again; the stale entry stays
+# until prune() drops everything no current source file points at.
+class SweepCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.manifest_path = os.path.join(cache_dir, "manifest.json")
+        self.manifest = self._read_manifest()
+        self.dirty = False
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as file:
+                manifest = json.load(file)
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {"version": MANIFEST_VERSION, "sources": {}, "entries": {}}
+
+    # Function to store the manifest. Another process (the dashboard and combine_freq.py share the
+    # cache) may have stored entries since it was read, so those are merged in rather than
+    # overwritten, unless replace is set (prune drops entries on purpose)
+    def _write_manifest(self, replace=False):
+        if not self.dirty:
+            return
+        if not replace:
+            stored = self._read_manifest()
+            # Entries of segments that are gone (e.g. found unreadable here) are not brought back
+            segments = {entry["segment"] for entry in stored["entries"].values()}
+            lost = {segment for segment in segments if not os.path.exists(os.path.join(self.cache_dir, segment))}
+            stored["entries"] = {key: entry for key, entry in stored["entries"].items() if entry["segment"] not in lost}
+            for part in ("sources", "entries"):
+                self.manifest[part] = {**stored[part], **self.manifest[part]}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_path = f"{self.manifest_path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self.manifest, file)
+        os.replace(temp_path, self.manifest_path)
+        self.dirty = False
+
+    # Function to get the content hash of a sweep, rehashing only when a file's size or mtime changed
+    def content_key(self, path):
+        files = source_files(os.path.abspath(path))
+        signature = []
+        for file_path in files:
+            stat = os.stat(file_path)
+            signature.append([os.path.basename(file_path), stat.st_size, stat.st_mtime_ns])
+        known = self.manifest["sources"].get(files[0])
+        if known and known["signature"] == signature:
+            return known["hash"]
+
+        digest = hashlib.blake2b(digest_size=20)
+        for file_path in files:
+            digest.update(os.path.basename(file_path).encode() + b"\0")
+            with open(file_path, "rb") as file:
+                digest.update(file.read())
+        self.manifest["sources"][files[0]] = {"signature": signature, "hash": digest.hexdigest()}
+        self.dirty = True
+        return digest.hexdigest()
+
+    # Function to load many sweeps at once: cached ones in one bulk read, the rest through loader
+    # (on the worker pool of load_sweeps; progress reports the parsed misses).
+    # columns, if given, keeps only those channels of every sweep. Misses are still parsed and
+    # cached whole, so asking for other channels later does not parse them again.
+    def load(self, paths, loader=load_sweep, workers=None, executor=None, progress=None, columns=None):
+        arrays = self.load_arrays(paths, loader, workers, executor, progress, columns)
+        return {
+            path: (pd.DataFrame(values, columns=columns), source)
+            for path, (columns, values, source) in arrays.items()
+        }
+
+    # Function to load many sweeps like load, as (columns, float array, source) without building frames.
+    # Cached sweeps are views into the segment that was read, so treat them as read-only.
+    def load_arrays(self, paths, loader=load_sweep, workers=None, executor=None, progress=None, columns=None):
+        keys = {path: self.content_key(path) for path in paths}
+        entries = self.manifest["entries"]
+
+        segments = {}
+        for key in set(keys.values()):
+            if key in entries and entries[key]["segment"] not in segments:
+                segment = entries[key]["segment"]
+                try:
+                    segments[segment] = self._read_segment(segment)
+                except (OSError, ValueError):
+                    # Lost or unreadable segment: forget what it held and parse those sweeps again
+                    for stale in [k for k, e in entries.items() if e["segment"] == segment]:
+                        del entries[stale]
+                    self.dirty = True
+
+        results, missing = {}, {}
+        for path, key in keys.items():
+            entry = entries.get(key)
+            if entry is None:
+                missing.setdefault(key, path)
+                continue
+            results[path] = (*self._slice(segments[entry["segment"]], entry, columns), entry["source"])
+
+        if missing:
+            parsed = load_sweeps(missing.values(), loader, workers, executor, progress)
+            loaded = {
+                key: (list(df.columns), df.to_numpy(dtype=float), source)
+                for key, (df, source) in zip(missing, parsed)
+            }
+            self._append_segment(loaded)
+            for path, key in keys.items():
+                if key in loaded:
+                    results[path] = self._project(*loaded[key], columns)
+        self._write_manifest()
+        return {path: results[path] for path in paths}
+
+    # Function to store what the cache learned, e.g. content hashes computed without loading anything
+    def save(self):
+        self._write_manifest()
+
+    # Function to tell which path ("hdf5" or "txt") a cached sweep was loaded from, None if not cached
+    def source(self, path):
+        entry = self.manifest["entries"].get(self.content_key(path))
+        return entry["source"] if entry else None
+
+    # Function to read a segment as its column positions and one float array
+    def _read_segment(self, segment):
+        table = pd.read_feather(os.path.join(self.cache_dir, segment))
+        return {column: i for i, column in enumerate(table.columns)}, table.to_numpy()
+
+    # Function to cut one sweep out of a segment as (columns, values), keeping only columns if given;
+    # a view when the columns line up
+    @staticmethod
+    def _slice(segment, entry, columns=None):
+        positions, values = segment
+        rows = values[entry["start"]:entry["stop"]]
+        kept = [column for column in entry["columns"] if columns is None or column in columns]
+        indices = [positions[column] for column in kept]
+        if indices == list(range(len(positions))):
+            return kept, rows
+        return kept, rows[:, indices]
+
+    # Function to keep only some channels of a freshly parsed (columns, values, source) sweep
+    @staticmethod
+    def _project(names, values, source, columns=None):
+        if columns is None:
+            return names, values, source
+        kept = [i for i, name in enumerate(names) if name in columns]
+        return [names[i] for i in kept], values[:, kept], source
+
+    # Function to write freshly parsed sweeps as one new segment
+    def _append_segment(self, loaded):
+        try:
+            import pyarrow  # noqa: F401  (Feather needs pyarrow; without it the cache only skips hashing)
+        except ImportError:
+            return
+        segment = f"segment-{uuid.uuid4().hex}.feather"
+        frames, start = [], 0
+        for key, (columns, values, source) in loaded.items():
+            frames.append(pd.DataFrame(values, columns=columns))
+            self.manifest["entries"][key] = {
+                "segment": segment, "start": start, "stop": start + len(values),
+                "columns": list(columns), "source": source,
+            }
+            start += len(values)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        pd.concat(frames, ignore_index=True).to_feather(os.path.join(self.cache_dir, segment))
+        self.dirty = True
+
+    # Function to drop entries no live source points at and compact the rest into one segment
+    def prune(self, live_paths):
+        live_keys = {self.content_key(path) for path in live_paths}
+        live_sources = {os.path.abspath(path) for path in live_paths}
+        entries = self.manifest["entries"]
+        orphans = [key for key in entries if key not in live_keys]
+
+        old_segments = {entry["segment"] for entry in entries.values()}
+        kept = {}
+        for segment in old_segments:
+            held = [key for key, entry in entries.items() if entry["segment"] == segment and key in live_keys]
+            if not held:
+                continue
+            table = self._read_segment(segment)
+            for key in held:
+                kept[key] = (*self._slice(table, entries[key]), entries[key]["source"])
+
+        self.manifest["entries"] = {}
+        self.manifest["sources"] = {
+            path: source for path, source in self.manifest["sources"].items() if path in live_sources
+        }
+        if kept:
+            self._append_segment(kept)
+        self.dirty = True
+        self._write_manifest(replace=True)
+
+        # Remove every segment file the manifest no longer references
+        referenced = {entry["segment"] for entry in self.manifest["entries"].values()}
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".feather") and name not in referenced:
+                os.remove(os.path.join(self.cache_dir, name))
+        return len(orphans)
+
+    # Function to summarize what the cache holds
+    def info(self):
+        entries = self.manifest["entries"]
+        segments = {entry["segment"] for entry in entries.values()}
+        size = sum(
+            os.path.getsize(os.path.join(self.cache_dir, segment))
+            for segment in segments
+            if os.path.exists(os.path.join(self.cache_dir, segment))
+        )
+        return {"entries": len(entries), "segments": len(segments), "bytes": size}
+
+# Function to list the .txt sweeps of a data directory
+def list_sweeps(data_dir):
+    return sorted(os.path.join(data_dir, f) for f in os.listdir(data_dir) if f.endswith(".txt"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the on-disk cache of parsed sweeps")
+    parser.add_argument("command", choices=["info", "warm", "prune"])
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="parse misses on this many workers")
+    parser.add_argument("--executor", choices=EXECUTORS, default=None)
+    args = parser.parse_args()
+
+    cache = SweepCache(args.cache_dir)
+    if args.command == "warm":
+        cache.load(list_sweeps(args.data_dir), workers=args.workers, executor=args.executor)
+    elif args.command == "prune":
+        removed = cache.prune(list_sweeps(args.data_dir))
+        print(f"Pruned {removed} orphaned entries")
+    info = cache.info()
+    print(f"{info['entries']} entries in {info['segments']} segments, {info['bytes'] / 1e6:.1f} MB in {args.cache_dir}")
+
+if __name__ == "__main__":
+    main()
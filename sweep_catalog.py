@@ -0,0 +1,100 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Filename grammar of a sweep, compiled once for every scan
+FILENAME_PATTERN = re.compile(
+    r"(?P<date>\d{4}-\d{2}-\d{2})_"
+    r"(?P<device_chemistry>[^-]+)-"
+    r"(?P<device_pixel>[^_]+)_"
+    r"(?P<device_configuration>.+?)-config_"
+    r"(?P<device_degradation>[^_]+)_"
+    r"(?P<frequency_range>[^_]+)_"
+    r"(?P<datapoint_capture>[^_]+)_"
+    r"(?P<voltage_offset>[^_]+)_"
+    r"(?P<voltage_amplitude>[^V]+)Vpk"
+)
+
+# Fields of the grammar, in filename order
+FIELDS = list(FILENAME_PATTERN.groupindex)
+
+# SI prefixes used in the frequency range field
+_PREFIXES = {"": 1.0, "k": 1e3, "M": 1e6}
+
+# Function to parse filenames
+def parse_filename(filename):
+    match = FILENAME_PATTERN.match(filename)
+    if match:
+        return match.groupdict()
+    return None
+
+# Function to build the typed metadata catalog of a list of sweep files.
+#
+# One row per file that matches the grammar, indexed by filename. The raw filename tokens
+# are kept as categoricals (they label groups and name output files) and their parsed
+# values are added next to them: date, offset_v, amplitude_v, degradation_days, points,
+# dwell_s, freq_max_hz and freq_min_hz.
+def build_catalog(filenames):
+    rows = {}
+    for filename in filenames:
+        match = FILENAME_PATTERN.match(filename)
+        if match:
+            rows[filename] = match.groupdict()
+    catalog = pd.DataFrame.from_dict(rows, orient="index", columns=FIELDS)
+    catalog.index.name = "file"
+
+    catalog["offset_v"] = pd.to_numeric(catalog["voltage_offset"].str.removesuffix("offset"), errors="coerce")
+    catalog["amplitude_v"] = pd.to_numeric(catalog["voltage_amplitude"], errors="coerce")
+    catalog["degradation_days"] = pd.to_numeric(
+        catalog["device_degradation"].str.extract(r"^(\d+)daydeg$", expand=False), errors="coerce"
+    ).astype("Int64")
+
+    capture = catalog["datapoint_capture"].str.extract(r"^(?P<points>\d+)p-(?P<dwell>[\d.]+)s$")
+    catalog["points"] = pd.to_numeric(capture["points"], errors="coerce").astype("Int64")
+    catalog["dwell_s"] = pd.to_numeric(capture["dwell"], errors="coerce").astype(float)
+
+    # "500k-5kHz" sweeps from 500 kHz down to 5 kHz; the unit is only written once, at the end
+    band = catalog["frequency_range"].str.extract(r"^([\d.]+)([kM]?)-([\d.]+)([kM]?)Hz$")
+    start = pd.to_numeric(band[0], errors="coerce") * band[1].map(_PREFIXES)
+    stop = pd.to_numeric(band[2], errors="coerce") * band[3].map(_PREFIXES)
+    catalog["freq_max_hz"] = np.fmax(start, stop)
+    catalog["freq_min_hz"] = np.fmin(start, stop)
+
+    for field in FIELDS:
+        catalog[field] = catalog[field].astype("category")
+    catalog["date"] = pd.to_datetime(catalog["date"].astype(str), format="%Y-%m-%d")
+    return catalog
+
+# Function to group the catalog's files by a list of raw filename fields, keyed by value tuples
+def group_files(catalog, fields):
+    groups = catalog.groupby(fields, observed=True, sort=True).groups
+    return {key if isinstance(key, tuple) else (key,): list(files) for key, files in groups.items()}
+
+# Function to build an inverted index from every raw filename field to the files carrying each value
+def build_facet_index(catalog, fields=FIELDS):
+    return {
+        field: {value: list(files) for value, files in catalog.groupby(field, observed=True).groups.items()}
+        for field in fields
+    }
+
+# Function to look up the files matching every given facet, e.g. select_files(index, voltage_offset="0offset")
+def select_files(facet_index, **facets):
+    selected = None
+    for field, value in facets.items():
+        files = set(facet_index[field].get(value, ()))
+        selected = files if selected is None else selected & files
+    return sorted(selected or ())
+
+# Function to index the group keys (over group_fields) found under each combination of facet_fields
+def build_key_index(catalog, facet_fields, group_fields):
+    fields = list(dict.fromkeys(facet_fields + group_fields))
+    facet_positions = [fields.index(field) for field in facet_fields]
+    group_positions = [fields.index(field) for field in group_fields]
+
+    index = {}
+    for combo in catalog.groupby(fields, observed=True, sort=True).size().index:
+        combo = combo if isinstance(combo, tuple) else (combo,)
+        facets = tuple(combo[i] for i in facet_positions)
+        index.setdefault(facets, []).append(tuple(combo[i] for i in group_positions))
+    return index
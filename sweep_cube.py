@@ -0,0 +1,209 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from sweep_cache import DEFAULT_CACHE_DIR, DEFAULT_DATA_DIR, SweepCache, list_sweeps
+
+# Storage modes: "double" holds every channel as float64; "mixed" holds the measurement channels
+# as float32 and only WIDE_CHANNELS as float64. That halves a cube, and the summaries and traces
+# the dashboard keeps between reruns (sweep_stats.GroupStats); the Welford state they are derived
+# from stays float64 in both modes
+PRECISIONS = ("double", "mixed")
+
+# Mode used when the caller does not pick one (override with SWEEP_PRECISION)
+DEFAULT_PRECISION = os.environ.get("SWEEP_PRECISION", "double")
+
+# Channels float32 cannot hold to the precision of the export: the frequency axis the sweeps are
+# grouped on (6 decimals up to 500 kHz) and the Timer_GET timestamps (6 decimals on ~1e5 s)
+WIDE_CHANNELS = ("Oscilator_frequency (Hz)", "Timer_GET (s)")
+
+# Dense store of many sweeps: one contiguous array shaped (sweeps, frequency points, channels).
+#
+# Sweeps shorter than the longest one are padded with NaN and lengths holds their real point
+# counts. metadata has one row per sweep in the same order (the catalog rows plus the path each
+# sweep was loaded from) and channel_index maps channel names to positions in channels.
+# In "mixed" precision data holds the float32 channels and wide the float64 ones (wide_channels);
+# points() and frame() still hand back float64 in the order of channels.
+class SweepCube:
+    def __init__(self, data, lengths, metadata, channels, wide=None, wide_channels=()):
+        self.data = data
+        self.wide = wide
+        self.lengths = lengths
+        self.metadata = metadata
+        self.channels = list(channels)
+        self.wide_channels = list(wide_channels)
+        self.channel_index = {channel: i for i, channel in enumerate(self.channels)}
+        narrow = [channel for channel in self.channels if channel not in self.wide_channels]
+        self._blocks = {channel: (self.data, i) for i, channel in enumerate(narrow)}
+        if wide is not None:
+            self._blocks.update({channel: (self.wide, i) for i, channel in enumerate(self.wide_channels)})
+        self._narrow_positions = [self.channel_index[channel] for channel in narrow]
+        self._wide_positions = [self.channel_index[channel] for channel in self.wide_channels]
+        self._rows = {file: i for i, file in enumerate(metadata.index)}
+
+    # Function to build a cube from (columns, values) pairs, one per metadata row
+    @classmethod
+    def from_arrays(cls, arrays, metadata, precision=None):
+        precision = precision or DEFAULT_PRECISION
+        if precision not in PRECISIONS:
+            raise ValueError(f"unknown precision {precision!r}, expected one of {PRECISIONS}")
+        channels = list(dict.fromkeys(column for columns, _ in arrays for column in columns))
+        wide_channels = [channel for channel in channels if channel in WIDE_CHANNELS] if precision == "mixed" else []
+        narrow = [channel for channel in channels if channel not in wide_channels]
+        lengths = np.array([len(values) for _, values in arrays], dtype=np.intp)
+        size = (len(arrays), lengths.max(initial=0))
+
+        data = np.full(size + (len(narrow),), np.nan, dtype=np.float32 if precision == "mixed" else np.float64)
+        wide = np.full(size + (len(wide_channels),), np.nan) if precision == "mixed" else None
+        for i, (columns, values) in enumerate(arrays):
+            columns = list(columns)
+            if wide is None and columns == channels:
+                data[i, :len(values)] = values
+                continue
+            for block, names in ((data, narrow), (wide, wide_channels)):
+                kept = [j for j, column in enumerate(columns) if column in names]
+                if block is not None and kept:
+                    block[i, :len(values)][:, [names.index(columns[j]) for j in kept]] = values[:, kept]
+        return cls(data, lengths, metadata, channels, wide, wide_channels)
+
+    def __len__(self):
+        return len(self.data)
+
+    # Bytes held by the sweep values
+    @property
+    def nbytes(self):
+        return self.data.nbytes + (self.wide.nbytes if self.wide is not None else 0)
+
+    # Function to find the cube rows of some files, in the order given
+    def rows(self, files):
+        return np.array([self._rows[file] for file in files], dtype=np.intp)
+
+    # Function to get the points of one sweep as a (points, channels) array, without the padding
+    # (a view in double precision, a float64 copy in mixed precision)
+    def points(self, row):
+        if self.wide is None:
+            return self.data[row, :self.lengths[row]]
+        points = np.empty((self.lengths[row], len(self.channels)))
+        points[:, self._narrow_positions] = self.data[row, :self.lengths[row]]
+        points[:, self._wide_positions] = self.wide[row, :self.lengths[row]]
+        return points
+
+    # Storage mode of the cube, see PRECISIONS
+    @property
+    def precision(self):
+        return "double" if self.wide is None else "mixed"
+
+    # Function to get some sweeps as one float64 (sweeps, points, channels) array in the order of channels, NaN-padded
+    def stack(self, rows):
+        rows = np.asarray(rows, dtype=np.intp)
+        if self.wide is None:
+            return self.data[rows]
+        stacked = np.empty(self.data[rows].shape[:2] + (len(self.channels),))
+        stacked[:, :, self._narrow_positions] = self.data[rows]
+        stacked[:, :, self._wide_positions] = self.wide[rows]
+        return stacked
+
+    # Function to get one channel of every sweep as a (sweeps, points) view, NaN-padded
+    def channel(self, name):
+        block, position = self._blocks[name]
+        return block[:, :, position]
+
+    # Function to get a cube holding only some rows
+    def take(self, rows):
+        rows = np.asarray(rows, dtype=np.intp)
+        wide = self.wide[rows] if self.wide is not None else None
+        return SweepCube(self.data[rows], self.lengths[rows], self.metadata.iloc[rows], self.channels, wide, self.wide_channels)
+
+    # Function to get one sweep as a DataFrame, with the columns of the original file
+    def frame(self, row):
+        return pd.DataFrame(self.points(row), columns=self.channels)
+
+# Function to load the sweeps of every catalog row from data_dir into a cube, through the on-disk cache
+# (columns, if given, keeps only those channels, so the cube holds nothing else; precision picks
+# the storage mode, see PRECISIONS)
+def load_cube(data_dir, catalog, cache=None, progress=None, columns=None, precision=None, executor=None):
+    cache = cache or SweepCache()
+    paths = [os.path.join(data_dir, file) for file in catalog.index]
+    loaded = cache.load_arrays(paths, executor=executor, progress=progress, columns=columns)
+    metadata = catalog.copy()
+    metadata["source"] = [loaded[path][2] for path in paths]
+    return SweepCube.from_arrays([loaded[path][:2] for path in paths], metadata, precision)
+
+# Function to compare a mixed precision copy of a double precision cube with the original, per channel:
+# bytes held in each mode and the largest absolute and relative error the mixed copy introduces
+def precision_report(cube):
+    mixed = SweepCube.from_arrays(
+        [(cube.channels, cube.points(row)) for row in range(len(cube))], cube.metadata, "mixed"
+    )
+    rows = {}
+    for channel in cube.channels:
+        full = cube.channel(channel)
+        reduced = mixed.channel(channel)
+        error = np.abs(reduced.astype(np.float64) - full)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            relative = np.where(full != 0, error / np.abs(full), 0.0)
+        rows[channel] = {
+            "dtype": str(reduced.dtype),
+            "double_bytes": full.size * full.itemsize,
+            "mixed_bytes": reduced.size * reduced.itemsize,
+            "max_abs_error": np.nanmax(error, initial=0.0),
+            "max_rel_error": np.nanmax(relative, initial=0.0),
+        }
+    report = pd.DataFrame.from_dict(rows, orient="index")
+    report.index.name = "channel"
+    return report
+
+# Dashboard grouping, mirrored from freq-filter-dataviz.py
+dashboard_group_fields = ["device_configuration", "frequency_range", "datapoint_capture", "voltage_offset"]
+
+# Function to aggregate every channel of a cube per dashboard group in each mode and count the bytes
+# the groups then hold with their summaries published: {precision: {"state_bytes", "published_bytes"}}
+def stats_footprint(cube):
+    from sweep_catalog import group_files
+    from sweep_stats import GroupStats
+
+    frequency = cube.channel_index[WIDE_CHANNELS[0]]
+    levels = ["device_chemistry", "voltage_amplitude", WIDE_CHANNELS[0]]
+    footprint = {}
+    for precision in PRECISIONS:
+        footprint[precision] = {"state_bytes": 0, "published_bytes": 0}
+        for files in group_files(cube.metadata, dashboard_group_fields).values():
+            group = GroupStats(levels, precision)
+            for row in cube.rows(files):
+                points = cube.points(row)
+                chemistry, amplitude = cube.metadata["device_chemistry"].iloc[row], cube.metadata["amplitude_v"].iloc[row]
+                level_values = [np.full(len(points), chemistry, dtype=object), np.full(len(points), amplitude), points[:, frequency]]
+                group.add_values(level_values, cube.channels, points)
+            group.traces()
+            for part, size in group.footprint().items():
+                footprint[precision][part] += size
+    return footprint
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the memory footprint and error of mixed precision sweep storage")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    args = parser.parse_args()
+
+    from sweep_catalog import build_catalog
+
+    catalog = build_catalog(os.path.basename(path) for path in list_sweeps(args.data_dir))
+    cube = load_cube(args.data_dir, catalog, SweepCache(args.cache_dir), precision="double")
+    report = precision_report(cube)
+    print(report.to_string(float_format=lambda value: f"{value:.3g}"))
+    double_bytes, mixed_bytes = report["double_bytes"].sum(), report["mixed_bytes"].sum()
+    print(f"{len(cube)} sweeps: {double_bytes / 1e6:.1f} MB in double precision, "
+          f"{mixed_bytes / 1e6:.1f} MB in mixed precision ({mixed_bytes / double_bytes:.0%})")
+
+    # What the dashboard keeps between reruns once every channel of every group is aggregated and shown
+    footprint = stats_footprint(cube)
+    totals = {precision: sum(parts.values()) for precision, parts in footprint.items()}
+    for precision, parts in footprint.items():
+        print(f"Group statistics in {precision} precision: {parts['state_bytes'] / 1e6:.1f} MB Welford state + "
+              f"{parts['published_bytes'] / 1e6:.1f} MB summaries and traces = {totals[precision] / 1e6:.1f} MB")
+    print(f"Mixed precision keeps {totals['mixed'] / totals['double']:.0%} of the group statistics")
+
+if __name__ == "__main__":
+    main()
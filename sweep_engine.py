@@ -0,0 +1,70 @@
+import os
+from functools import cached_property
+
+from sweep_cache import DEFAULT_CACHE_DIR, DEFAULT_DATA_DIR, SweepCache, directory_fingerprint, list_sweeps, source_files
+from sweep_catalog import build_catalog
+from sweep_cube import load_cube
+from sweep_grid import align_cube
+from sweep_reader import read_columns
+
+# The sweep archive as the dashboard and combine_freq.py see it: a data directory scanned into a
+# metadata catalog, and its sweeps parsed through the on-disk sweep cache. Both tools keep their
+# cache in DEFAULT_CACHE_DIR, so whichever runs first after a change parses the new sweeps and the
+# other reads them back from the cache.
+class SweepEngine:
+    # executor picks the pool cache misses are parsed on (see sweep_reader.DEFAULT_EXECUTOR)
+    def __init__(self, data_dir=None, cache_dir=None, executor=None):
+        self.data_dir = data_dir or DEFAULT_DATA_DIR
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.executor = executor
+
+    # The cache manifest is only read once the engine is asked for something the cache knows
+    @cached_property
+    def cache(self):
+        return SweepCache(self.cache_dir)
+
+    def path(self, file):
+        return os.path.join(self.data_dir, file)
+
+    # Function to fingerprint the data directory (changes whenever a sweep is added, removed or rewritten)
+    def fingerprint(self):
+        return directory_fingerprint(self.data_dir)
+
+    # Function to build the metadata catalog of every .txt sweep in the data directory
+    def scan(self):
+        return build_catalog(os.path.basename(path) for path in list_sweeps(self.data_dir))
+
+    # Function to list the channels of the sweeps, read from the header of the first one
+    def columns(self, catalog):
+        if catalog.empty:
+            return []
+        return read_columns(self.path(catalog.index[0]))
+
+    # Function to get the content hash of every file, as the cache keys it
+    def content_keys(self, files):
+        return {file: self.cache.content_key(self.path(file)) for file in files}
+
+    # Function to list the files (the .txt and any .hdf5 twin) a sweep is read from
+    def source_files(self, file):
+        return source_files(self.path(file))
+
+    # Function to tell which path ("hdf5" or "txt") each file was loaded from, None if it is not cached yet
+    def sources(self, files):
+        return {file: self.cache.source(self.path(file)) for file in files}
+
+    # Function to load the sweeps of some catalog rows into a cube aligned on the log grid of their
+    # band (density and method as in sweep_grid.align_cube; a density of 0 keeps the measured
+    # frequencies); columns and progress are passed on to sweep_cube.load_cube
+    def load(self, catalog, columns=None, progress=None, density=None, method=None):
+        cube = load_cube(self.data_dir, catalog, self.cache, progress=progress, columns=columns, executor=self.executor)
+        return align_cube(cube, density, method)
+
+    # Function to parse and cache the files that are not in the cache yet, without loading the
+    # others; returns the number of files parsed
+    def warm(self, files, progress=None):
+        keys = self.content_keys(files)
+        missing = [self.path(file) for file, key in keys.items() if key not in self.cache.manifest["entries"]]
+        if missing:
+            self.cache.load_arrays(missing, executor=self.executor, progress=progress)
+        self.cache.save()
+        return len(missing)
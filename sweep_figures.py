@@ -0,0 +1,91 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Figures kept by a FigureCache by default (override with SWEEP_FIGURE_CACHE_SIZE; 0 turns caching off)
+DEFAULT_FIGURE_CACHE_SIZE = int(os.environ.get("SWEEP_FIGURE_CACHE_SIZE", 32))
+
+# Points in a figure above which its traces are drawn with WebGL instead of SVG (override with SWEEP_WEBGL_THRESHOLD)
+DEFAULT_WEBGL_THRESHOLD = int(os.environ.get("SWEEP_WEBGL_THRESHOLD", 5000))
+
+# Points a trace is downsampled to when downsampling is on (override with SWEEP_MAX_POINTS)
+DEFAULT_MAX_POINTS = int(os.environ.get("SWEEP_MAX_POINTS", 1000))
+
+# Bounded least-recently-used cache of built figures, keyed on everything a figure is drawn from.
+# Safe to share between sessions; a figure handed out must not be changed by the caller.
+class FigureCache:
+    def __init__(self, size=None):
+        self.size = DEFAULT_FIGURE_CACHE_SIZE if size is None else size
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Function to get the figure for key, calling build() to make it on a miss; the least
+    # recently used figure is dropped once the cache holds more than size figures
+    def get(self, key, build):
+        with self._lock:
+            if key in self._figures:
+                self.hits += 1
+                self._figures.move_to_end(key)
+                return self._figures[key]
+            self.misses += 1
+
+        figure = build()
+        with self._lock:
+            self._figures[key] = figure
+            while len(self._figures) > self.size:
+                self._figures.popitem(last=False)
+        return figure
+
+    def __len__(self):
+        return len(self._figures)
+
+# Function to pick which of the (ascending x) points to keep with Largest-Triangle-Three-Buckets:
+# the first and last point, and from each of points - 2 equal buckets in between the point spanning
+# the largest triangle with the point kept before it and the mean of the next bucket. Peaks and
+# notches survive because they span large triangles. Returns the indices of the kept points.
+def lttb(x, y, points):
+    size = len(x)
+    if points >= size or points < 3:
+        return np.arange(size)
+    edges = np.linspace(1, size - 1, points - 1).astype(int)
+    kept = np.empty(points, dtype=int)
+    kept[0], kept[-1] = 0, size - 1
+    previous = 0
+    for bucket in range(points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else size
+        next_x, next_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        area = np.abs((x[previous] - next_x) * (y[start:stop] - y[previous]) - (x[previous] - x[start:stop]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(np.nan_to_num(area, nan=-1.0)))
+        kept[bucket + 1] = previous
+    return kept
+
+# Function to build the trace of one averaged sweep: frequency, mean and (optionally) std as error bars.
+# With max_points the sweep is downsampled by lttb in log-frequency space, so a band's resonance
+# keeps its shape however many decades it spans; webgl draws it with Scattergl.
+def sweep_trace(frequency, mean, std=None, name=None, webgl=False, max_points=0):
+    import plotly.graph_objects as go
+
+    frequency, mean = np.asarray(frequency, dtype=float), np.asarray(mean, dtype=float)
+    std = None if std is None else np.asarray(std, dtype=float)
+    if max_points and len(frequency) > max_points:
+        order = np.argsort(frequency, kind="stable")
+        x = np.log10(frequency[order]) if (frequency > 0).all() else frequency[order]
+        order = order[lttb(x, mean[order], max_points)]
+        frequency, mean = frequency[order], mean[order]
+        std = None if std is None else std[order]
+
+    trace = go.Scattergl if webgl else go.Scatter
+    return trace(
+        x=frequency,
+        y=mean,
+        error_y=dict(array=std, visible=std is not None),
+        mode="markers+lines",
+        name=name,
+        line=dict(width=2),
+        marker=dict(size=8),
+    )
@@ -0,0 +1,119 @@
+import os
+
+import numpy as np
+
+from sweep_cube import SweepCube
+from sweep_reader import FREQUENCY_COLUMN, TEXT_DECIMALS
+
+# Ways of putting a sweep on the grid: "interpolate" reads every channel off the sweep linearly in
+# log frequency at each grid point; "snap" averages the points of a sweep nearest each grid point
+ALIGN_METHODS = ("interpolate", "snap")
+
+# Points per decade of the canonical grid, 0 keeping the measured frequencies (override with
+# SWEEP_GRID_DENSITY), and the method used when the caller does not pick one (override with
+# SWEEP_ALIGN_METHOD). Alignment is off by default: sweeps that share a band and capture setting
+# (every dashboard group and every stitched range) already share their exact frequencies, and
+# putting them on a grid only interpolates away measured points. It is meant for averaging
+# sweeps taken with different capture settings.
+DEFAULT_DENSITY = int(os.environ.get("SWEEP_GRID_DENSITY", 0))
+DEFAULT_ALIGN_METHOD = os.environ.get("SWEEP_ALIGN_METHOD", "interpolate")
+
+# Function to build the canonical grid of a band: log-spaced from freq_min to freq_max, both ends
+# included (so neighbouring bands share their edge) and rounded like the text export
+def band_grid(freq_min, freq_max, density=None):
+    density = DEFAULT_DENSITY if density is None else density
+    points = max(2, int(round(np.log10(freq_max / freq_min) * density)) + 1)
+    return np.round(np.geomspace(freq_min, freq_max, points), TEXT_DECIMALS)
+
+# Function to sort NaN-padded sweeps by log frequency; returns the sorted log frequencies, the
+# values in the same order and the number of real points of each sweep
+def _sorted_by_frequency(values, frequency):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_frequency = np.log10(values[:, :, frequency])
+    log_frequency[~np.isfinite(log_frequency)] = np.nan
+    # argsort puts NaN (the padding) last
+    order = np.argsort(log_frequency, axis=1)
+    log_frequency = np.take_along_axis(log_frequency, order, axis=1)
+    values = np.take_along_axis(values, order[:, :, None], axis=1)
+    return log_frequency, values, np.count_nonzero(~np.isnan(log_frequency), axis=1)
+
+# Interpolate (sweeps, points, channels) onto the grid, all sweeps in one search
+def _interpolate(values, frequency, grid):
+    log_frequency, values, counts = _sorted_by_frequency(values, frequency)
+    sweeps, points = log_frequency.shape
+    target = np.log10(grid)
+
+    # Lay the sweeps end to end on one axis (padding parked at the end of its own sweep), so a
+    # single searchsorted finds the bracketing points of every grid point in every sweep
+    base = min(np.nanmin(log_frequency, initial=target[0]), target[0])
+    width = max(np.nanmax(log_frequency, initial=target[-1]), target[-1]) - base + 2
+    offsets = np.arange(sweeps)[:, None] * width
+    keys = np.where(np.isnan(log_frequency), width - 1, log_frequency - base) + offsets
+    right = np.searchsorted(keys.ravel(), (target - base + offsets).ravel()).reshape(sweeps, -1)
+    right -= np.arange(sweeps)[:, None] * points
+    right = np.clip(right, 1, np.maximum(counts - 1, 1)[:, None])
+    left = right - 1
+
+    x0 = np.take_along_axis(log_frequency, left, axis=1)
+    x1 = np.take_along_axis(log_frequency, right, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight = np.clip(np.where(x1 > x0, (target - x0) / (x1 - x0), 0.0), 0.0, 1.0)
+    y0 = np.take_along_axis(values, left[:, :, None], axis=1)
+    y1 = np.take_along_axis(values, right[:, :, None], axis=1)
+    aligned = y0 + weight[:, :, None] * (y1 - y0)
+
+    # No extrapolation: grid points outside the measured range of a sweep stay empty
+    first = log_frequency[:, 0]
+    last = np.take_along_axis(log_frequency, np.maximum(counts - 1, 0)[:, None], axis=1)[:, 0]
+    tolerance = 1e-9
+    outside = (target < first[:, None] - tolerance) | (target > last[:, None] + tolerance)
+    aligned[outside] = np.nan
+    return aligned
+
+# Average the points of every sweep nearest (in log frequency) each grid point
+def _snap(values, frequency, grid):
+    log_frequency, values, _ = _sorted_by_frequency(values, frequency)
+    sweeps, _, channels = values.shape
+    target = np.log10(grid)
+
+    valid = ~np.isnan(log_frequency)
+    nearest = np.searchsorted((target[1:] + target[:-1]) / 2, log_frequency[valid])
+    cells = (np.nonzero(valid)[0] * len(grid) + nearest)
+    samples = values[valid]
+    present = ~np.isnan(samples)
+
+    totals = np.zeros((sweeps * len(grid), channels))
+    counts = np.zeros((sweeps * len(grid), channels))
+    np.add.at(totals, cells, np.where(present, samples, 0.0))
+    np.add.at(counts, cells, present)
+    with np.errstate(invalid="ignore"):
+        return (totals / counts).reshape(sweeps, len(grid), channels)
+
+_ALIGNERS = {"interpolate": _interpolate, "snap": _snap}
+
+# Function to align every sweep of a cube onto the canonical grid of its band (freq_min_hz to
+# freq_max_hz in the cube metadata), one vectorized pass per band. Each aligned sweep keeps only
+# the grid points it has data for; sweeps without a parsed band are kept as measured.
+def align_cube(cube, density=None, method=None):
+    density = DEFAULT_DENSITY if density is None else density
+    method = method or DEFAULT_ALIGN_METHOD
+    if method not in _ALIGNERS:
+        raise ValueError(f"unknown method {method!r}, expected one of {ALIGN_METHODS}")
+    if density <= 0:
+        return cube
+
+    frequency = cube.channel_index[FREQUENCY_COLUMN]
+    others = [i for i in range(len(cube.channels)) if i != frequency]
+    arrays = [None] * len(cube)
+    bands = cube.metadata.reset_index().groupby(["freq_min_hz", "freq_max_hz"]).indices
+    for (freq_min, freq_max), rows in bands.items():
+        grid = band_grid(freq_min, freq_max, density)
+        aligned = _ALIGNERS[method](cube.stack(rows), frequency, grid)
+        aligned[:, :, frequency] = grid
+        has_data = ~np.all(np.isnan(aligned[:, :, others]), axis=2) if others else np.ones(aligned.shape[:2], dtype=bool)
+        for row, values, keep in zip(rows, aligned, has_data):
+            arrays[row] = values[keep]
+    for row in range(len(cube)):
+        if arrays[row] is None:
+            arrays[row] = cube.points(row)
+    return SweepCube.from_arrays([(cube.channels, values) for values in arrays], cube.metadata, cube.precision)
@@ -0,0 +1,47 @@
+import numpy as np
+
+# Function to put the points of a sweep in ascending frequency order, dropping points without a
+# frequency. A sweep measured downwards is just reversed; only a non-monotonic one gets sorted.
+def ascending(points, frequency):
+    frequencies = points[:, frequency]
+    if np.isnan(frequencies).any():
+        points = points[~np.isnan(frequencies)]
+        frequencies = points[:, frequency]
+    steps = np.diff(frequencies)
+    if (steps >= 0).all():
+        return points
+    if (steps <= 0).all():
+        return points[::-1]
+    return points[np.argsort(frequencies, kind="stable")]
+
+# Function to merge sweeps that are each in ascending frequency order into one ascending sweep,
+# averaging the channels of coincident frequencies (such as shared band edges); NaN values are
+# left out of the averages.
+#
+# Every point goes straight to its place in the merged order: its index in its own sweep plus the
+# number of points of each other sweep that come before it (ties go to the earlier sweep). Equal
+# frequencies then sit next to each other and are reduced run by run, so nothing is re-sorted.
+def merge_sweeps(sweeps, frequency):
+    sweeps = list(sweeps)
+    channels = sweeps[0].shape[1] if sweeps else 0
+    keys = [sweep[:, frequency] for sweep in sweeps]
+
+    merged = np.empty((sum(len(sweep) for sweep in sweeps), channels))
+    for i, sweep in enumerate(sweeps):
+        rank = np.arange(len(sweep))
+        for j, other in enumerate(keys):
+            if j != i:
+                rank += np.searchsorted(other, keys[i], side="right" if j < i else "left")
+        merged[rank] = sweep
+    if not len(merged):
+        return merged
+
+    frequencies = merged[:, frequency]
+    starts = np.flatnonzero(np.r_[True, frequencies[1:] != frequencies[:-1]])
+    if len(starts) == len(merged):
+        return merged
+    valid = ~np.isnan(merged)
+    totals = np.add.reduceat(np.where(valid, merged, 0.0), starts)
+    counts = np.add.reduceat(valid, starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return totals / counts
@@ -0,0 +1,198 @@
+import io
+import multiprocessing
+import os
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Parsing backends understood by read_sweep
+ENGINES = ("numpy", "pandas", "pyarrow")
+
+# Backend used when the caller does not pick one (override with SWEEP_READER_ENGINE)
+DEFAULT_ENGINE = os.environ.get("SWEEP_READER_ENGINE", "numpy")
+
+# Function to split the raw bytes of a sweep into its column names and numeric body
+def split_header(raw):
+    newline = raw.find(b"\n")
+    if newline == -1 or not raw.startswith(b"#"):
+        raise ValueError("sweep file does not start with a '#' header line")
+    header_line = raw[:newline].decode().lstrip("# ").strip()
+    return header_line.split("\t"), raw[newline + 1:]
+
+# Function to read only the column names of a sweep .txt file
+def read_columns(path):
+    with open(path, "rb") as file:
+        columns, _ = split_header(file.readline())
+    return columns
+
+# Function to pick the columns to keep, in file order; None keeps them all
+def _projection(columns, keep):
+    if keep is None:
+        return list(columns)
+    return [column for column in columns if column in keep]
+
+# NumPy fast path: every value is a float separated by whitespace
+def _parse_numpy(body, columns, keep=None):
+    values = np.fromstring(body, dtype=np.float64, sep=" ")
+    if values.size % len(columns):
+        raise ValueError(f"{values.size} values do not fill {len(columns)} columns")
+    values = values.reshape(-1, len(columns))
+    kept = _projection(columns, keep)
+    if kept != columns:
+        # Copy the kept columns out so the full parse can be freed
+        values = values[:, [columns.index(column) for column in kept]].copy()
+    return pd.DataFrame(values, columns=kept)
+
+# pandas C engine with the dtype fixed up front, so no type inference is run
+def _parse_pandas(body, columns, keep=None):
+    return pd.read_csv(
+        io.BytesIO(body), sep=r"\s+", header=None, names=columns,
+        usecols=_projection(columns, keep), dtype=np.float64, comment="#", engine="c"
+    )
+
+# pyarrow CSV reader; most exports end each row with a tab, which shows up as one extra empty field
+def _parse_pyarrow(body, columns, keep=None):
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+
+    first_row = body[:body.find(b"\n")].rstrip(b"\r")
+    trailing = ["__trailing__"] if first_row.endswith(b"\t") else []
+    table = pa_csv.read_csv(
+        io.BytesIO(body),
+        read_options=pa_csv.ReadOptions(column_names=columns + trailing),
+        parse_options=pa_csv.ParseOptions(delimiter="\t"),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=_projection(columns, keep),
+            column_types={column: pa.float64() for column in columns},
+        ),
+    )
+    return table.to_pandas()
+
+_PARSERS = {"numpy": _parse_numpy, "pandas": _parse_pandas, "pyarrow": _parse_pyarrow}
+
+# Function to read a lock-in sweep .txt file in a single pass; columns, if given, keeps only those
+def read_sweep(path, engine=None, columns=None):
+    engine = engine or DEFAULT_ENGINE
+    if engine not in _PARSERS:
+        raise ValueError(f"unknown engine {engine!r}, expected one of {ENGINES}")
+    with open(path, "rb") as file:
+        raw = file.read()
+    names, body = split_header(raw)
+    return _PARSERS[engine](body, names, columns)
+
+# Name of the sweep axis; the text export rounds it to 6 decimals and the aggregation groups on it
+FREQUENCY_COLUMN = "Oscilator_frequency (Hz)"
+TEXT_DECIMALS = 6
+
+# Function to read the Data_name dataset of a sweep .hdf5 file: (name, unit, device, description)
+# per column, keyed by the column names of the .txt export
+def read_data_names(path):
+    import h5py
+
+    with h5py.File(path, "r") as file:
+        rows = [tuple(field[0].decode() for field in row) for row in file["Data_name"][()]]
+    return {f"{row[0]} ({row[1]})": row for row in rows}
+
+# Function to read the Data dataset of a sweep .hdf5 file, with the same column names as the .txt export
+# (columns, if given, keeps only those; the others are never read off disk)
+def read_sweep_hdf5(path, columns=None):
+    import h5py
+
+    with h5py.File(path, "r") as file:
+        # Data_name holds (name, unit, device, description) per column
+        names = [f"{name[0][0].decode()} ({name[1][0].decode()})" for name in file["Data_name"][()]]
+        kept = _projection(names, columns)
+        if kept == names:
+            values = file["Data"][()]
+        else:
+            values = file["Data"][:, [names.index(column) for column in kept]]
+    df = pd.DataFrame(values, columns=kept)
+    # Round the frequency axis like the text export so sweeps from either source share exact frequencies
+    if FREQUENCY_COLUMN in df:
+        df[FREQUENCY_COLUMN] = df[FREQUENCY_COLUMN].round(TEXT_DECIMALS)
+    return df
+
+# Function to find the .hdf5 twin written next to a sweep .txt file
+def hdf5_twin(path):
+    twin = os.path.splitext(path)[0] + ".hdf5"
+    return twin if os.path.exists(twin) else None
+
+# Whether load_sweep reads a sweep's .hdf5 twin instead of its .txt (set SWEEP_PREFER_HDF5=1 to turn it on).
+# Off by default: on raw_data h5py takes ~1.1 ms per file against ~0.4 ms for the NumPy text parser
+# (benchmarks/bench_readers.py), and both agree to the 6 decimals the text export is written with.
+PREFER_HDF5 = os.environ.get("SWEEP_PREFER_HDF5", "0") == "1"
+
+# Function to load a sweep from its .txt, or from its binary .hdf5 twin when prefer_hdf5 (default
+# PREFER_HDF5) is set and there is one; returns the data and the path taken
+def load_sweep(path, engine=None, columns=None, prefer_hdf5=None):
+    prefer_hdf5 = PREFER_HDF5 if prefer_hdf5 is None else prefer_hdf5
+    twin = hdf5_twin(path) if prefer_hdf5 else None
+    if twin is not None:
+        try:
+            return read_sweep_hdf5(twin, columns), "hdf5"
+        except (ImportError, OSError, KeyError):
+            # h5py missing or a twin still being written: the text file is always there
+            pass
+    return read_sweep(path, engine, columns), "txt"
+
+# Worker pools understood by load_sweeps
+EXECUTORS = ("thread", "process", "serial")
+
+# Pool used when the caller does not pick one (override with SWEEP_WORKERS and SWEEP_EXECUTOR).
+# Processes are the only pool that scales with the core count for the default read paths: the
+# NumPy text parser holds the GIL and h5py serializes every read on its global lock, so threads
+# only help the pandas and pyarrow text engines.
+DEFAULT_WORKERS = int(os.environ.get("SWEEP_WORKERS", os.cpu_count() or 1))
+DEFAULT_EXECUTOR = os.environ.get("SWEEP_EXECUTOR", "process")
+
+# Function to load many sweeps on a worker pool; results come back in the order of paths.
+# progress, if given, is called as progress(done, total) from the calling thread.
+def load_sweeps(paths, loader=load_sweep, workers=None, executor=None, progress=None):
+    paths = list(paths)
+    workers = DEFAULT_WORKERS if workers is None else workers
+    executor = executor or DEFAULT_EXECUTOR
+    if executor not in EXECUTORS:
+        raise ValueError(f"unknown executor {executor!r}, expected one of {EXECUTORS}")
+
+    if executor != "serial" and workers > 1 and len(paths) > 1:
+        try:
+            return _load_pooled(paths, loader, workers, executor, progress)
+        except (BrokenExecutor, OSError):
+            # No pool on this host (or a worker died): load everything in this process instead
+            pass
+
+    results = []
+    for path in paths:
+        results.append(loader(path))
+        if progress:
+            progress(len(results), len(paths))
+    return results
+
+# Function to get the start method of the process pool: a forkserver (spawn where there is none),
+# never a plain fork, since the dashboard loads from a thread of the multi-threaded Streamlit server.
+# Workers start in a fresh interpreter that only imports this module and the caller's __main__,
+# which is Streamlit's launcher for the dashboard and is behind a __main__ guard in the scripts.
+def _process_context():
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    # The server imports the parsers once and every worker is forked from it already warm
+    context.set_forkserver_preload([__name__])
+    return context
+
+def _load_pooled(paths, loader, workers, executor, progress):
+    if executor == "thread":
+        pool = ThreadPoolExecutor(max_workers=workers)
+        chunksize = 1
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=_process_context())
+        chunksize = max(1, len(paths) // (workers * 4))
+    results = []
+    with pool:
+        # map yields in submission order, so progress advances deterministically
+        for result in pool.map(loader, paths, chunksize=chunksize):
+            results.append(result)
+            if progress:
+                progress(len(results), len(paths))
+    return results
@@ -0,0 +1,258 @@
+import os
+import pickle
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from sweep_cube import DEFAULT_PRECISION, PRECISIONS, WIDE_CHANNELS
+
+# Bump when the stored layout changes; older stores are rebuilt from scratch
+STATS_VERSION = 4
+
+# Sufficient statistics of one group of sweeps: per-row count, mean and sum of squared deviations
+# (Welford state) of every numeric channel, per row of the levels they are averaged over (e.g.
+# chemistry, amplitude, frequency). Sweeps are folded in one at a time with a vectorized Welford
+# update, so memory stays at one row per unique level combination however many sweeps a group
+# has, there is no concatenated copy of the group and mean and std come out of a single pass.
+# Unlike a raw sum of squares this does not cancel for large, steady values such as Timer_GET.
+# mean and m2 stay float64 whatever the precision is, as float32 running means drift on those same
+# values, and count is held as integers. precision (default SWEEP_PRECISION, see sweep_cube.PRECISIONS)
+# is how the published summary and traces are held: "mixed" keeps every channel but WIDE_CHANNELS
+# as float32 there. It is a setting of the process, so it is not stored with the statistics.
+class GroupStats:
+    def __init__(self, levels, precision=None):
+        self.precision = precision or DEFAULT_PRECISION
+        if self.precision not in PRECISIONS:
+            raise ValueError(f"unknown precision {self.precision!r}, expected one of {PRECISIONS}")
+        self.levels = list(levels)
+        self.columns = []
+        self.rows = {}
+        self.count = np.zeros((0, 0), dtype=np.int32)
+        self.mean = np.zeros((0, 0))
+        self.m2 = np.zeros((0, 0))
+        self.sweeps = {}
+        self._summary = None
+        self._traces = None
+
+    # Function to fold new sweeps in, one at a time; keys identifies each one (file -> content hash).
+    # A sweep is either a frame carrying the level columns or a (level values, columns, values) tuple;
+    # columns, if given, aggregates only those of its channels.
+    def add(self, sweeps, keys, columns=None):
+        for sweep in sweeps:
+            if isinstance(sweep, pd.DataFrame):
+                level_values = [sweep[level] for level in self.levels]
+                numeric = sweep.select_dtypes(include=["number"])
+                names, values = list(numeric.columns), numeric.to_numpy(dtype=float)
+            else:
+                level_values, names, values = sweep
+            if columns is not None:
+                kept = [i for i, name in enumerate(names) if name in columns]
+                names, values = [names[i] for i in kept], values[:, kept]
+            self.add_values(level_values, names, values)
+        self.sweeps.update(keys)
+
+    # Function to aggregate further channels over the sweeps already folded in, the first time they are
+    # asked for; load(files, columns) returns {file: sweep}. Returns the channels that were added.
+    # The channels are folded into a side copy and only published once complete, so readers
+    # (summary, traces) in other threads never see a half-aggregated channel; writers must still
+    # be serialized by the caller.
+    def materialize(self, columns, load):
+        missing = [column for column in columns if column not in self.columns]
+        if not missing:
+            return missing
+        side = GroupStats(self.levels, self.precision)
+        side.rows = dict(self.rows)
+        # A channel the sweeps do not have is still marked, so it is not looked for again
+        side._ensure_columns(missing)
+        if self.sweeps:
+            sweeps = load(list(self.sweeps), missing)
+            side.add((sweeps.pop(file) for file in list(self.sweeps)), {}, missing)
+        self._publish(side)
+        return missing
+
+    # Function to append the channels of a side copy (same rows, possibly more) to this group.
+    # New arrays go in first, then the rows, then the columns, which is the reverse of the order
+    # summary reads them in, so a reader sees either the old channels or all of the new ones.
+    def _publish(self, side):
+        rows = max(self.count.shape[0], side.count.shape[0], len(side.rows))
+        width = len(self.columns) + len(side.columns)
+        published = []
+        for own, new in ((self.count, side.count), (self.mean, side.mean), (self.m2, side.m2)):
+            grown = np.zeros((rows, width), dtype=own.dtype)
+            grown[:own.shape[0], :own.shape[1]] = own
+            grown[:new.shape[0], own.shape[1]:] = new
+            published.append(grown)
+        self.count, self.mean, self.m2 = published
+        self.rows = side.rows
+        self.columns = self.columns + side.columns
+
+    # Function to fold in one sweep given as its per-row level values and a (points, columns) array
+    def add_values(self, level_values, columns, values):
+        self._ensure_columns(columns)
+        if list(columns) != self.columns:
+            aligned = np.full((len(values), len(self.columns)), np.nan)
+            aligned[:, [self.columns.index(column) for column in columns]] = values
+            values = aligned
+
+        positions = self._positions(level_values)
+        self._summary = self._traces = None
+        # A row repeated inside one sweep is folded in over several passes, one occurrence per pass
+        pending = np.arange(len(positions))
+        while pending.size:
+            _, first = np.unique(positions[pending], return_index=True)
+            take = pending[first]
+            self._update(positions[take], values[take])
+            pending = np.delete(pending, first)
+
+    # Welford step for distinct rows p; NaN values leave their channel untouched
+    def _update(self, p, x):
+        valid = ~np.isnan(x)
+        count = self.count[p] + valid
+        delta = np.where(valid, x - self.mean[p], 0.0)
+        mean = self.mean[p] + np.divide(delta, count, out=np.zeros_like(delta), where=valid)
+        self.m2[p] += delta * (np.where(valid, x, 0.0) - np.where(valid, mean, 0.0))
+        self.mean[p] = mean
+        self.count[p] = count
+
+    # Function to map each row of a sweep to its statistics row, adding rows for new level values
+    def _positions(self, level_values):
+        keys = zip(*(np.asarray(values).tolist() for values in level_values))
+        positions = np.array([self.rows.setdefault(key, len(self.rows)) for key in keys], dtype=np.intp)
+        if len(self.rows) > self.count.shape[0]:
+            capacity = max(len(self.rows), 2 * self.count.shape[0], 64)
+            self.count, self.mean, self.m2 = (self._grow(array, rows=capacity) for array in (self.count, self.mean, self.m2))
+        return positions
+
+    def _ensure_columns(self, columns):
+        new_columns = [column for column in columns if column not in self.columns]
+        if new_columns:
+            self.columns += new_columns
+            self._summary = self._traces = None
+            self.count, self.mean, self.m2 = (self._grow(array, columns=len(self.columns)) for array in (self.count, self.mean, self.m2))
+
+    @staticmethod
+    def _grow(array, rows=None, columns=None):
+        grown = np.zeros((rows or array.shape[0], columns or array.shape[1]), dtype=array.dtype)
+        grown[:array.shape[0], :array.shape[1]] = array
+        return grown
+
+    # Function to derive the per-row mean and sample standard deviation (ddof=1, as pandas).
+    # The result is kept until the group changes; it is tagged with the channels it was built from,
+    # so a summary built while materialize published more channels is not kept past that.
+    def summary(self):
+        columns = self.columns
+        if self._summary is None or self._summary[0] is not columns:
+            rows = list(self.rows)
+            size, width = len(rows), len(columns)
+            index = pd.MultiIndex.from_tuples(rows, names=self.levels)
+            count = self.count[:size, :width]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mean = np.where(count > 0, self.mean[:size, :width], np.nan)
+                std = np.where(count > 1, np.sqrt(self.m2[:size, :width] / (count - 1)), np.nan)
+            self._summary = (
+                columns,
+                self._published(mean, index, columns).sort_index(),
+                self._published(std, index, columns).sort_index(),
+            )
+        return self._summary[1:]
+
+    # Function to build a summary frame in the dtypes of precision, one column per channel
+    def _published(self, values, index, columns):
+        narrow = np.float32 if self.precision == "mixed" else np.float64
+        return pd.DataFrame({
+            column: values[:, i].astype(np.float64 if column in WIDE_CHANNELS else narrow)
+            for i, column in enumerate(columns)
+        }, index=index)
+
+    # Function to split the summary per combination of all levels but the last (e.g. per chemistry and
+    # amplitude): {prefix: (mean, std)}, each a list with one array per channel whose points run
+    # along the last level in order. They are read-only views of the summary columns, so a channel
+    # of one prefix, mean[self.columns.index(channel)], is a contiguous slice that costs no copy.
+    def traces(self):
+        summary = self.summary()
+        if self._traces is None or self._traces[0] is not summary[0]:
+            mean_df, std_df = summary
+            mean, std = ([df[column].to_numpy() for column in df.columns] for df in (mean_df, std_df))
+            prefixes = mean_df.index.droplevel(-1)
+            # The summary is sorted, so the rows of each prefix are one run
+            starts = np.flatnonzero(~prefixes.duplicated())
+            stops = np.append(starts[1:], len(prefixes))
+            self._traces = (mean_df, {
+                prefixes[start]: ([channel[start:stop] for channel in mean], [channel[start:stop] for channel in std])
+                for start, stop in zip(starts, stops)
+            })
+        return self._traces[1]
+
+    # Function to count the bytes the group holds: its Welford state and its published summary
+    # (traces are views of the summary and add nothing); the summary is only held once it was asked for
+    def footprint(self):
+        state = sum(array.nbytes for array in (self.count, self.mean, self.m2))
+        published = 0
+        if self._summary is not None:
+            published = sum(df.memory_usage(index=False).sum() for df in self._summary[1:])
+        return {"state_bytes": state, "published_bytes": int(published)}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        size = len(self.rows)
+        state.update(count=self.count[:size], mean=self.mean[:size], m2=self.m2[:size], _summary=None, _traces=None)
+        del state["precision"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.precision = DEFAULT_PRECISION
+
+# Function to bring stored group statistics up to date with the current group memberships.
+#
+# members maps group key -> {file: content hash}; load(files, columns) returns {file: sweep}, each
+# sweep carrying the levels the groups are averaged over and at least the channels in columns
+# (None for all of them).
+# New files are folded into their group. A group that lost or changed a file is rebuilt
+# from its current files, and groups that no longer exist are dropped, so only the groups
+# a change touches are recomputed. A new or rebuilt group aggregates the given columns; an
+# existing one keeps to the channels it already has. Returns the keys that were updated.
+def update_stats(stats, members, load, levels, columns=None):
+    for key in [key for key in stats if key not in members]:
+        del stats[key]
+
+    pending, wanted = {}, {}
+    for key, sweeps in members.items():
+        group = stats.get(key)
+        if group is None or any(sweeps.get(file) != digest for file, digest in group.sweeps.items()):
+            group = stats[key] = GroupStats(levels)
+        new_files = [file for file in sweeps if file not in group.sweeps]
+        if new_files:
+            pending[key] = new_files
+            wanted[key] = group.columns if group.sweeps else columns
+
+    if not pending:
+        return []
+    needed = None
+    if all(group_columns is not None for group_columns in wanted.values()):
+        needed = list(dict.fromkeys(column for group_columns in wanted.values() for column in group_columns))
+    frames = load([file for files in pending.values() for file in files], needed)
+    for key, files in pending.items():
+        # Each loaded sweep is released as soon as it has been folded in
+        stats[key].add((frames.pop(file) for file in files), {file: members[key][file] for file in files}, wanted[key])
+    return list(pending)
+
+# Function to read stored group statistics; layout identifies how the groups were built
+def load_stats(path, layout):
+    try:
+        with open(path, "rb") as file:
+            stored = pickle.load(file)
+        if stored.get("version") == STATS_VERSION and stored.get("layout") == layout:
+            return stored["groups"]
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError):
+        pass
+    return {}
+
+# Function to store group statistics, replacing the previous file atomically
+def save_stats(path, layout, stats):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, "wb") as file:
+        pickle.dump({"version": STATS_VERSION, "layout": layout, "groups": stats}, file)
+    os.replace(temp_path, path)
@@ -0,0 +1,52 @@
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Timings are logged here as one JSON object per stage (silence with SWEEP_TIMING_LOG=0)
+logger = logging.getLogger("sweep_timing")
+if os.environ.get("SWEEP_TIMING_LOG", "1") != "0" and not logger.handlers:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# Wall-clock timings of the stages of one run (e.g. one dashboard rerun), in the order they started.
+# Stages can nest; each one is also logged as {"run", "stage", "parent", "ms"} when it ends.
+class StageTimer:
+    def __init__(self, run=None):
+        self.run = run or uuid.uuid4().hex[:8]
+        self.stages = []
+        self._open = []
+        self._start = time.perf_counter()
+
+    # Function to time the body of a with block as one stage
+    @contextmanager
+    def stage(self, name):
+        record = {"stage": name, "parent": self._open[-1]["stage"] if self._open else None, "depth": len(self._open), "ms": None}
+        self.stages.append(record)
+        self._open.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["ms"] = (time.perf_counter() - start) * 1000
+            self._open.pop()
+            logger.info(json.dumps({"run": self.run, "stage": name, "parent": record["parent"], "ms": round(record["ms"], 3)}))
+
+    # Milliseconds since the timer was created
+    @property
+    def elapsed_ms(self):
+        return (time.perf_counter() - self._start) * 1000
+
+    # Function to tabulate the finished stages, nested ones indented under their parent
+    def frame(self):
+        return pd.DataFrame(
+            [(" " * record["depth"] + record["stage"], record["ms"]) for record in self.stages if record["ms"] is not None],
+            columns=["stage", "ms"],
+        )
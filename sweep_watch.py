@@ -0,0 +1,110 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+# inotify event bits (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_CLOEXEC = 0o2000000
+
+# Events that mean a file in the watched directory is being written or has just arrived
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# Seconds a file must stay quiet before it counts as fully written (override with SWEEP_WATCH_DEBOUNCE)
+DEFAULT_DEBOUNCE = float(os.environ.get("SWEEP_WATCH_DEBOUNCE", 2.0))
+
+# struct inotify_event: int wd; uint32_t mask, cookie, len; followed by len bytes of name
+_EVENT = struct.Struct("iIII")
+
+# Thin ctypes binding of Linux inotify: one instance descriptor, read with an optional timeout
+class Inotify:
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform")
+        self._libc = libc
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+    # Function to watch a path for the events in mask; returns the watch descriptor
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    # Function to read pending events as (wd, mask, name), waiting up to timeout seconds (None waits for ever)
+    def read(self, timeout=None):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        buffer = os.read(self.fd, 64 * 1024)
+        events, offset = [], 0
+        while offset < len(buffer):
+            wd, mask, _, length = _EVENT.unpack_from(buffer, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(buffer[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Function to find the files of a directory modified less than seconds ago: {name: age in seconds}
+def recently_modified(path, seconds, suffixes=None):
+    now = time.time()
+    ages = {}
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if suffixes is not None and not entry.name.endswith(suffixes):
+                continue
+            try:
+                age = now - entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if age < seconds and entry.is_file():
+                ages[entry.name] = max(age, 0.0)
+    return ages
+
+# Function to watch a directory and yield, batch by batch, the names of files that were written and
+# then left alone for debounce seconds, so a sweep still being written is never picked up half done.
+# Each batch comes with the names still being written at that point (events in the last debounce
+# seconds, or a modification time that recent for files changed without an event seen here, e.g.
+# before the watch started), as (settled, busy). suffixes, if given, ignores every other file.
+def watch(path, debounce=None, suffixes=None):
+    debounce = DEFAULT_DEBOUNCE if debounce is None else debounce
+    with Inotify() as inotify:
+        inotify.add_watch(path)
+        # name -> time of the last event seen for it
+        pending = {}
+        while True:
+            timeout = max(0.0, min(pending.values()) + debounce - time.monotonic()) if pending else None
+            for _, _, name in inotify.read(timeout):
+                if name and (suffixes is None or name.endswith(suffixes)):
+                    pending[name] = time.monotonic()
+
+            now = time.monotonic()
+            if any(now - last >= debounce for last in pending.values()):
+                # A recent change with no event seen keeps a file pending, so it settles in a later batch
+                for name, age in recently_modified(path, debounce, suffixes).items():
+                    pending[name] = max(pending.get(name, now - age), now - age)
+                settled = sorted(name for name, last in pending.items() if now - last >= debounce)
+                for name in settled:
+                    del pending[name]
+                if settled:
+                    yield settled, sorted(pending)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+# Formats a sweep can be written in, with their file extensions
+OUTPUT_FORMATS = {"txt": ".txt", "parquet": ".parquet", "npz": ".npz", "hdf5": ".hdf5"}
+
+# Formats that can hold many sweeps in one file
+CONSOLIDATED_FORMATS = ("parquet", "npz", "hdf5")
+
+# Function to build the Data_name array of the .hdf5 export, shaped (columns, 4, 1): name, unit,
+# device and description per column. labels maps columns to rows read from an input .hdf5 (see
+# sweep_reader.read_data_names); any other column is split from its "name (unit)" form.
+def data_names(columns, labels=None):
+    rows = []
+    for column in columns:
+        if labels and column in labels:
+            rows.append(labels[column])
+            continue
+        name, separator, unit = column.rpartition(" (")
+        if not separator:
+            name, unit = column, ""
+        rows.append((name, unit.removesuffix(")"), "", name))
+    return np.array([[[field.encode()] for field in row] for row in rows], dtype="S200")
+
+# Function to write one sweep with Data and Data_name into an open HDF5 file or group
+def _write_hdf5(group, df, labels):
+    group.create_dataset("Data", data=df.to_numpy(dtype=np.float64))
+    group.create_dataset("Data_name", data=data_names(df.columns, labels))
+
+# Function to write a sweep in one of OUTPUT_FORMATS: tab-separated text with a "# " header line
+# (as the lock-in export), Parquet, or NPZ and HDF5 with the Data / Data_name layout of raw_data/*.hdf5
+def write_sweep(path, df, output_format="txt", labels=None):
+    if output_format == "txt":
+        with open(path, "w") as new_file:
+            new_file.write("# " + "\t".join(df.columns) + "\n")
+            df.to_csv(new_file, sep="\t", index=False, header=False)
+    elif output_format == "parquet":
+        df.to_parquet(path, index=False)
+    elif output_format == "npz":
+        with open(path, "wb") as file:
+            np.savez(file, Data=df.to_numpy(dtype=np.float64), Data_name=data_names(df.columns, labels))
+    elif output_format == "hdf5":
+        import h5py
+
+        with h5py.File(path, "w") as file:
+            _write_hdf5(file, df, labels)
+    else:
+        raise ValueError(f"unknown format {output_format!r}, expected one of {tuple(OUTPUT_FORMATS)}")
+
+# Function to write many sweeps ({name: frame}) into one file of a CONSOLIDATED_FORMATS format:
+# Parquet gets one table with a leading "file" column, NPZ "<name>/Data" and "<name>/Data_name"
+# arrays, and HDF5 one group per sweep holding Data and Data_name
+def write_consolidated(path, sweeps, output_format, labels=None):
+    if output_format == "parquet":
+        frames = [df.assign(file=name)[["file"] + list(df.columns)] for name, df in sweeps.items()]
+        pd.concat(frames, ignore_index=True).to_parquet(path, index=False)
+    elif output_format == "npz":
+        arrays = {}
+        for name, df in sweeps.items():
+            arrays[f"{name}/Data"] = df.to_numpy(dtype=np.float64)
+            arrays[f"{name}/Data_name"] = data_names(df.columns, labels)
+        with open(path, "wb") as file:
+            np.savez(file, **arrays)
+    elif output_format == "hdf5":
+        import h5py
+
+        with h5py.File(path, "w") as file:
+            for name, df in sweeps.items():
+                _write_hdf5(file.create_group(name), df, labels)
+    else:
+        raise ValueError(f"cannot write {output_format!r} consolidated, expected one of {CONSOLIDATED_FORMATS}")